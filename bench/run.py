@@ -0,0 +1,75 @@
+"""Times the benchmark programs in this directory on each engine.
+
+    python bench/run.py [--engine ENGINE] [--repeat N] [--memory] [--frame-pool N]
+                        [program.lox ...]
+
+Each program runs in-process N times per engine and the best time is
+reported, so the numbers compare engines and changes, not start-up cost.
+With --memory each program instead runs once per engine in a fresh
+interpreter process and that process's peak resident memory is reported.
+--frame-pool runs every program with a frame pool of that size, to compare
+against plain allocation.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from lox.lox import ENGINES, Lox
+from lox.options import Options
+
+def best_time(source, engine, repeat, frame_pool=None):
+    best = None
+    for _ in range(repeat):
+        lox = Lox(Options(engine=engine, frame_pool=frame_pool))
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            lox.run(source)
+            elapsed = time.perf_counter() - start
+        if lox.had_error or lox.had_runtime_error:
+            raise SystemExit(f"benchmark failed on engine {engine}")
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def peak_memory(path, engine, frame_pool=None):
+    root = os.path.join(os.path.dirname(__file__), "..")
+    command = [sys.executable, "-m", "lox", "--engine", engine]
+    if frame_pool:
+        command += ["--frame-pool", str(frame_pool)]
+    process = subprocess.Popen(command + [path], cwd=root, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise SystemExit(f"benchmark failed on engine {engine}")
+    # ru_maxrss is in kilobytes on Linux.
+    return usage.ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Lox benchmarks.")
+    parser.add_argument("programs", nargs="*")
+    parser.add_argument("--engine", action="append", choices=ENGINES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--memory", action="store_true",
+                        help="report peak memory instead of time")
+    parser.add_argument("--frame-pool", type=int, metavar="N",
+                        help="reuse up to N call and block scopes")
+    args = parser.parse_args()
+
+    programs = args.programs or sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.lox")))
+    for path in programs:
+        with open(path) as file:
+            source = file.read()
+        for engine in args.engine or ENGINES:
+            if args.memory:
+                print(f"{os.path.basename(path):<20} {engine:<12} "
+                      f"{peak_memory(os.path.abspath(path), engine, args.frame_pool):.0f} MB")
+                continue
+            print(f"{os.path.basename(path):<20} {engine:<12} {best_time(source, engine, args.repeat, args.frame_pool):.3f}s")
+
+if __name__ == "__main__":
+    main()
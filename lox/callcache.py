@@ -0,0 +1,54 @@
+import sys
+
+# Callees a site may switch between before it stops caching.
+MAX_MISSES = 4
+
+# The cached callee of a site that has none. Unlike None, no Lox value
+# (nil included) is ever this object.
+_EMPTY = object()
+
+def _generic(callee, interpreter, arguments):
+    return callee.__call__(interpreter, arguments)
+
+class CallCache:
+    """Remembers the last callee of one Call site.
+
+    While the same function, class or native is called again, the site
+    skips the callable check and the arity lookup and calls the `__call__`
+    of the callee's class directly: Loxfunction makes the argument list its
+    scope and LoxClass runs its cached initializer on the new instance.
+    A site whose callee keeps changing is megamorphic after MAX_MISSES
+    misses and takes the generic path from then on.
+    """
+
+    __slots__ = ("callee", "arity", "invoke", "hits", "misses", "megamorphic")
+
+    def __init__(self):
+        self.callee = _EMPTY
+        self.arity = 0
+        self.invoke = _generic
+        self.hits = 0
+        self.misses = 0
+        self.megamorphic = False
+
+    def update(self, callee):
+        """Records a checked callee that missed and returns how to call it."""
+        self.misses += 1
+        if self.megamorphic:
+            return _generic
+        if self.misses > MAX_MISSES:
+            self.megamorphic = True
+            self.callee = _EMPTY
+            return _generic
+
+        self.callee = callee
+        self.arity = callee.arity
+        self.invoke = type(callee).__call__
+        return self.invoke
+
+def report(caches, file=sys.stderr):
+    hits = sum(cache.hits for cache in caches)
+    misses = sum(cache.misses for cache in caches)
+    megamorphic = sum(cache.megamorphic for cache in caches)
+    print(f"call caches: {len(caches)} site(s), {hits} hits, {misses} misses; "
+          f"{megamorphic} megamorphic", file=file)
@@ -0,0 +1,114 @@
+import math
+from enum import IntEnum
+
+class OpCode(IntEnum):
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    GET_LOCAL = 5
+    SET_LOCAL = 6
+    GET_GLOBAL = 7
+    DEFINE_GLOBAL = 8
+    SET_GLOBAL = 9
+    GET_UPVALUE = 10
+    SET_UPVALUE = 11
+    GET_PROPERTY = 12
+    SET_PROPERTY = 13
+    GET_SUPER = 14
+    EQUAL = 15
+    NOT_EQUAL = 16
+    GREATER = 17
+    GREATER_EQUAL = 18
+    LESS = 19
+    LESS_EQUAL = 20
+    ADD = 21
+    SUBTRACT = 22
+    MULTIPLY = 23
+    DIVIDE = 24
+    NOT = 25
+    NEGATE = 26
+    PRINT = 27
+    JUMP = 28
+    JUMP_IF_FALSE = 29
+    LOOP = 30
+    CALL = 31
+    GET_METHOD = 32
+    CLOSURE = 33
+    CLOSE_UPVALUE = 34
+    RETURN = 35
+    CLASS = 36
+    INHERIT = 37
+    METHOD = 38
+    CALL_METHOD = 39
+
+# Number of inline operands following each opcode. CLOSURE is followed by
+# two extra operands per upvalue on top of its constant index.
+OPERANDS = {
+    OpCode.CONSTANT: 1,
+    OpCode.GET_LOCAL: 1,
+    OpCode.SET_LOCAL: 1,
+    OpCode.GET_GLOBAL: 1,
+    OpCode.DEFINE_GLOBAL: 1,
+    OpCode.SET_GLOBAL: 1,
+    OpCode.GET_UPVALUE: 1,
+    OpCode.SET_UPVALUE: 1,
+    OpCode.GET_PROPERTY: 1,
+    OpCode.SET_PROPERTY: 1,
+    OpCode.GET_SUPER: 1,
+    OpCode.JUMP: 1,
+    OpCode.JUMP_IF_FALSE: 1,
+    OpCode.LOOP: 1,
+    OpCode.CALL: 1,
+    OpCode.GET_METHOD: 1,
+    OpCode.CALL_METHOD: 1,
+    OpCode.CLOSURE: 1,
+    OpCode.CLASS: 1,
+    OpCode.METHOD: 1,
+}
+
+class Chunk:
+    def __init__(self):
+        self.code = []
+        self.tokens = []
+        self.constants = []
+        self._constant_index = {}
+
+    def write(self, byte, token):
+        self.code.append(byte)
+        self.tokens.append(token)
+
+    def add_constant(self, value):
+        key = (type(value), value)
+        if type(value) is float and value == 0:
+            # 0 and -0 are equal but print differently.
+            key += (math.copysign(1.0, value),)
+        if key not in self._constant_index:
+            self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+
+        return self._constant_index[key]
+
+    def disassemble(self, name):
+        lines = [f"== {name} =="]
+        offset = 0
+        while offset < len(self.code):
+            op = OpCode(self.code[offset])
+            operands = self.code[offset + 1:offset + 1 + OPERANDS.get(op, 0)]
+            line = self.tokens[offset].line if self.tokens[offset] else "|"
+            text = f"{offset:04d} {line:>4} {op.name:<16}"
+            if operands:
+                text += " " + " ".join(str(o) for o in operands)
+            if op in (OpCode.CONSTANT, OpCode.GET_GLOBAL, OpCode.DEFINE_GLOBAL,
+                      OpCode.SET_GLOBAL, OpCode.GET_PROPERTY, OpCode.SET_PROPERTY,
+                      OpCode.GET_SUPER, OpCode.GET_METHOD, OpCode.CLOSURE,
+                      OpCode.CLASS, OpCode.METHOD):
+                text += f" '{self.constants[operands[0]]}'"
+            lines.append(text)
+
+            offset += 1 + len(operands)
+            if op == OpCode.CLOSURE:
+                offset += 2 * self.constants[operands[0]].upvalue_count
+
+        return "\n".join(lines)
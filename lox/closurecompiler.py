@@ -0,0 +1,602 @@
+from .environment import UNDEFINED, Cell, Environment
+from .exception import RuntimeException
+from .expr import Expr
+from .interpreter import Interpreter
+from .loxcallable import LoxCallable
+from .loxfunction import Loxfunction
+from .loxinstance import LoxInstance
+from .memoize import MemoizedFunction
+from .returnvalue import RETURN, TAIL_CALL
+from .stmt import Stmt
+from .token import TokenType
+
+class ClosureCompiler(Expr, Stmt):
+    """Turns resolved statements into nested, pre-bound Python closures.
+
+    Every node is visited once. The closure built for it calls the closures
+    of its children directly and reads the interpreter's current
+    environment at run time, so no visitor dispatch is left on the hot path.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def compile(self, node):
+        return node.accept(self)
+
+    def compile_block(self, statements):
+        compiled = [self.compile(statement) for statement in statements]
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def block():
+            for statement in compiled:
+                completion = statement()
+                if completion is not None:
+                    return completion
+        return block
+
+    def compile_condition(self, expr):
+        value = self.compile(expr)
+
+        def condition():
+            result = value()
+            return result is not None and result is not False
+        return condition
+
+    def visit_expression_stmt(self, stmt):
+        expression = self.compile(stmt.expression)
+
+        def expression_():
+            expression()
+        return expression_
+
+    def visit_print_stmt(self, stmt):
+        value = self.compile(stmt.expression)
+        stringify = self.interpreter._stringify
+
+        def print_():
+            print(stringify(value()))
+        return print_
+
+    def visit_var_stmt(self, stmt):
+        interpreter = self.interpreter
+        name = stmt.name.lexeme
+        initializer = None
+        if stmt.initializer:
+            initializer = self.compile(stmt.initializer)
+
+        if stmt.boxed:
+            def boxed_var():
+                value = initializer() if initializer is not None else None
+                interpreter.environment.define(name, Cell(value))
+            return boxed_var
+
+        def var():
+            value = initializer() if initializer is not None else None
+            interpreter.environment.define(name, value)
+        return var
+
+    def visit_block_stmt(self, stmt):
+        interpreter = self.interpreter
+        body = self.compile_block(stmt.statements)
+        if not stmt.scoped:
+            return body
+
+        pool = interpreter.frame_pool
+        if pool is not None:
+            blocks = pool.blocks
+            size = pool.size
+
+            def pooled_block():
+                previous = interpreter.environment
+                if blocks:
+                    pool.reused += 1
+                    environment = blocks.pop()
+                    environment.enclosing = previous
+                else:
+                    pool.allocated += 1
+                    environment = Environment(previous)
+
+                interpreter.environment = environment
+                try:
+                    completion = body()
+                finally:
+                    interpreter.environment = previous
+
+                if len(blocks) < size:
+                    environment.values.clear()
+                    environment.enclosing = None
+                    blocks.append(environment)
+                else:
+                    pool.dropped += 1
+                return completion
+            return pooled_block
+
+        def block():
+            previous = interpreter.environment
+            interpreter.environment = Environment(previous)
+            try:
+                return body()
+            finally:
+                interpreter.environment = previous
+        return block
+
+    def visit_if_stmt(self, stmt):
+        condition = self.compile_condition(stmt.condition)
+        then_branch = self.compile(stmt.then_branch)
+
+        if not stmt.else_branch:
+            def if_():
+                if condition():
+                    return then_branch()
+            return if_
+
+        else_branch = self.compile(stmt.else_branch)
+
+        def if_else():
+            if condition():
+                return then_branch()
+            return else_branch()
+        return if_else
+
+    def visit_while_stmt(self, stmt):
+        condition = self.compile_condition(stmt.condition)
+        body = self.compile(stmt.body)
+
+        def while_():
+            while condition():
+                completion = body()
+                if completion is not None:
+                    return completion
+        return while_
+
+    def visit_function_stmt(self, stmt):
+        interpreter = self.interpreter
+        name = stmt.name.lexeme
+
+        if stmt.boxed:
+            return lambda: interpreter.visit_function_stmt(stmt)
+
+        def function():
+            memo = interpreter.memos.get(stmt)
+            if memo is None:
+                func = Loxfunction(stmt, interpreter.capture(stmt), False)
+            else:
+                func = MemoizedFunction(stmt, interpreter.capture(stmt), memo)
+            interpreter.environment.define(name, func)
+        return function
+
+    def visit_return_stmt(self, stmt):
+        interpreter = self.interpreter
+        if stmt in interpreter.tail_calls:
+            return self._compile_tail_call(stmt.value)
+
+        value = self.compile(stmt.value) if stmt.value else None
+
+        def return_():
+            interpreter.return_value = value() if value is not None else None
+            return RETURN
+        return return_
+
+    def _compile_tail_call(self, expr):
+        interpreter = self.interpreter
+        callee = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+
+        def tail_call():
+            function = callee()
+            values = [argument() for argument in arguments]
+            interpreter._check_call(expr, function, values)
+
+            if type(function) is Loxfunction:
+                interpreter.tail_call = (function, values)
+                return TAIL_CALL
+
+            interpreter.return_value = function.__call__(interpreter, values)
+            return RETURN
+        return tail_call
+
+    def visit_class_stmt(self, stmt):
+        # Class declarations run once, the tree-walker handles them.
+        interpreter = self.interpreter
+
+        def class_():
+            interpreter.visit_class_stmt(stmt)
+        return class_
+
+    def visit_literal_expr(self, expr):
+        value = expr.value
+        return lambda: value
+
+    def visit_grouping_expr(self, expr):
+        return self.compile(expr.expression)
+
+    def visit_unary_expr(self, expr):
+        right = self.compile(expr.right)
+        operator = expr.operator
+
+        if operator.token_type == TokenType.MINUS:
+            def negate():
+                value = right()
+                if isinstance(value, float):
+                    return -value
+                raise RuntimeException(operator, "Operand must be a number.")
+            return negate
+
+        def not_():
+            value = right()
+            return value is None or value is False
+        return not_
+
+    # Operands proven to be numbers by TypeInference need no checks.
+    def visit_number_add_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() + right()
+
+    def visit_number_subtract_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() - right()
+
+    def visit_number_multiply_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() * right()
+
+    def visit_number_divide_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() / right()
+
+    def visit_number_greater_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() > right()
+
+    def visit_number_greater_equal_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() >= right()
+
+    def visit_number_less_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() < right()
+
+    def visit_number_less_equal_expr(self, expr):
+        left, right = self.compile(expr.left), self.compile(expr.right)
+        return lambda: left() <= right()
+
+    def visit_number_negate_expr(self, expr):
+        right = self.compile(expr.right)
+        return lambda: -right()
+
+    def visit_binary_expr(self, expr):
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+        operator = expr.operator
+        token_type = operator.token_type
+        is_equal = self.interpreter._is_equal
+
+        if token_type == TokenType.PLUS:
+            def add():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a + b
+                if isinstance(a, str) and isinstance(b, str):
+                    return a + b
+                raise RuntimeException(operator,
+                                       "Operands must be two numbers or two strings.")
+            return add
+        if token_type == TokenType.EQUAL_EQUAL:
+            return lambda: is_equal(left(), right())
+        if token_type == TokenType.BANG_EQUAL:
+            return lambda: not is_equal(left(), right())
+
+        if token_type == TokenType.MINUS:
+            def subtract():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a - b
+                raise RuntimeException(operator, "Operands must be numbers.")
+            return subtract
+        if token_type == TokenType.STAR:
+            def multiply():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a * b
+                raise RuntimeException(operator, "Operands must be numbers.")
+            return multiply
+        if token_type == TokenType.SLASH:
+            def divide():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a / b
+                raise RuntimeException(operator, "Operands must be numbers.")
+            return divide
+        if token_type == TokenType.GREATER:
+            def greater():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a > b
+                raise RuntimeException(operator, "Operands must be numbers.")
+            return greater
+        if token_type == TokenType.GREATER_EQUAL:
+            def greater_equal():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a >= b
+                raise RuntimeException(operator, "Operands must be numbers.")
+            return greater_equal
+        if token_type == TokenType.LESS:
+            def less():
+                a = left()
+                b = right()
+                if isinstance(a, float) and isinstance(b, float):
+                    return a < b
+                raise RuntimeException(operator, "Operands must be numbers.")
+            return less
+
+        def less_equal():
+            a = left()
+            b = right()
+            if isinstance(a, float) and isinstance(b, float):
+                return a <= b
+            raise RuntimeException(operator, "Operands must be numbers.")
+        return less_equal
+
+    def visit_logical_expr(self, expr):
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+
+        if expr.operator.token_type == TokenType.OR:
+            def or_():
+                value = left()
+                if value is not None and value is not False:
+                    return value
+                return right()
+            return or_
+
+        def and_():
+            value = left()
+            if value is None or value is False:
+                return value
+            return right()
+        return and_
+
+    def _lookup(self, expr, name):
+        interpreter = self.interpreter
+        access = interpreter.accesses.get(expr)
+
+        if access is None:
+            cell = interpreter.globals.cell(name.lexeme)
+
+            def get_global():
+                value = cell.value
+                if value is UNDEFINED:
+                    raise RuntimeException(name, f"Undefined variable '{name.lexeme}'.")
+                return value
+            return get_global
+
+        distance, slot, boxed = access
+        if boxed:
+            if distance == 0:
+                return lambda: interpreter.environment.values[slot].value
+            if distance == 1:
+                return lambda: interpreter.environment.enclosing.values[slot].value
+            return lambda: interpreter.environment.get_at(distance, slot).value
+        if distance == 0:
+            return lambda: interpreter.environment.values[slot]
+        if distance == 1:
+            return lambda: interpreter.environment.enclosing.values[slot]
+        return lambda: interpreter.environment.get_at(distance, slot)
+
+    def visit_variable_expr(self, expr):
+        return self._lookup(expr, expr.name)
+
+    def visit_this_expr(self, expr):
+        return self._lookup(expr, expr.keyword)
+
+    def visit_assign_expr(self, expr):
+        interpreter = self.interpreter
+        value = self.compile(expr.value)
+        name = expr.name
+        access = interpreter.accesses.get(expr)
+
+        if access is None:
+            globals = interpreter.globals
+            cell = globals.cell(name.lexeme)
+
+            def assign_global():
+                result = value()
+                globals.assign_cell(cell, name, result)
+                return result
+            return assign_global
+
+        distance, slot, boxed = access
+
+        if boxed:
+            def assign_cell():
+                result = value()
+                interpreter.environment.get_at(distance, slot).value = result
+                return result
+            return assign_cell
+
+        def assign():
+            result = value()
+            interpreter.environment.assign_at(distance, slot, result)
+            return result
+        return assign
+
+    def visit_call_expr(self, expr):
+        interpreter = self.interpreter
+        callee = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        paren = expr.paren
+        cache = interpreter._call_cache(expr)
+
+        def call():
+            function = callee()
+            values = [argument() for argument in arguments]
+
+            if function is cache.callee:
+                cache.hits += 1
+                if len(values) != cache.arity:
+                    raise RuntimeException(paren,
+                                           f"Expected {cache.arity} arguments but got {len(values)}.")
+                invoke = cache.invoke
+            else:
+                if not isinstance(function, LoxCallable):
+                    raise RuntimeException(paren, "Can only call functions and classes.")
+
+                if len(values) != function.arity:
+                    raise RuntimeException(paren,
+                                           f"Expected {function.arity} arguments but got {len(values)}.")
+                invoke = cache.update(function)
+
+            try:
+                return invoke(function, interpreter, values)
+            except RecursionError:
+                raise RuntimeException(paren, "Stack overflow.") from None
+        return call
+
+    def visit_invoke_expr(self, expr):
+        interpreter = self.interpreter
+        get = expr.callee
+        obj = self.compile(get.object_)
+        name = get.name
+        cache = interpreter._property_cache(get)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        paren = expr.paren
+
+        def invoke():
+            instance = obj()
+            if not isinstance(instance, LoxInstance):
+                raise RuntimeException(name, "Only instances have properties.")
+
+            method = cache.method(instance)
+            if method is None:
+                # A field holding something callable, read before the
+                # arguments can change it.
+                function = cache.get(instance)
+                values = [argument() for argument in arguments]
+                if not isinstance(function, LoxCallable):
+                    raise RuntimeException(paren, "Can only call functions and classes.")
+            else:
+                function = method
+                values = [argument() for argument in arguments]
+
+            if len(values) != function.arity:
+                raise RuntimeException(paren,
+                                       f"Expected {function.arity} arguments but got {len(values)}.")
+
+            try:
+                if method is None:
+                    return function.__call__(interpreter, values)
+                return method.__call__(interpreter, values, instance)
+            except RecursionError:
+                raise RuntimeException(paren, "Stack overflow.") from None
+        return invoke
+
+    def visit_inline_expr(self, expr):
+        interpreter = self.interpreter
+        callee = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        body = self.compile(expr.body)
+        declaration = expr.declaration
+        call = self.visit_call_expr(expr)
+
+        def inline():
+            function = callee()
+            if type(function) is not Loxfunction or function.declaration is not declaration:
+                # Looking the global up again is harmless, so the ordinary
+                # call can start over. A memoized function takes it too.
+                return call()
+
+            values = [argument() for argument in arguments]
+            previous = interpreter.inline_arguments
+            interpreter.inline_arguments = values
+            result = body()
+            interpreter.inline_arguments = previous
+            return result
+        return inline
+
+    def visit_argument_expr(self, expr):
+        interpreter = self.interpreter
+        index = expr.index
+        return lambda: interpreter.inline_arguments[index]
+
+    def visit_get_expr(self, expr):
+        obj = self.compile(expr.object_)
+        name = expr.name
+        cache = self.interpreter._property_cache(expr)
+        entries = cache.entries
+
+        def get():
+            instance = obj()
+            if isinstance(instance, LoxInstance):
+                # The cache hit, inlined; misses take the full path.
+                entry = entries.get(instance.shape)
+                if entry is None:
+                    return cache.get(instance)
+                cache.hits += 1
+                index, method = entry
+                if method is None:
+                    return instance.values[index]
+                return method.bind(instance)
+            raise RuntimeException(name, "Only instances have properties.")
+        return get
+
+    def visit_set_expr(self, expr):
+        obj = self.compile(expr.object_)
+        value = self.compile(expr.value)
+        name = expr.name
+        cached_set = self.interpreter._property_cache(expr).set
+
+        def set_():
+            instance = obj()
+            if not isinstance(instance, LoxInstance):
+                raise RuntimeException(name, "Only instances have fields.")
+            result = value()
+            cached_set(instance, result)
+            return result
+        return set_
+
+    def visit_super_expr(self, expr):
+        interpreter = self.interpreter
+        return lambda: interpreter.visit_super_expr(expr)
+
+class ClosureInterpreter(Interpreter):
+    """Interpreter that runs closure-compiled code instead of walking the tree.
+
+    Function bodies are compiled the first time they are executed and shared
+    by every Loxfunction created from the same declaration.
+    """
+
+    def __init__(self, lox):
+        super().__init__(lox)
+        self.compiler = ClosureCompiler(self)
+        self._bodies = {}
+
+    def interpret(self, statements):
+        try:
+            for statement in statements:
+                self.compiler.compile(statement)()
+        except RuntimeException as re:
+            self.lox.runtime_error(re)
+
+    def execute_block(self, statements, environment):
+        entry = self._bodies.get(id(statements))
+        if entry is None:
+            # Keep the statements alive so their id is never reused.
+            entry = (statements, self.compiler.compile_block(statements))
+            self._bodies[id(statements)] = entry
+        body = entry[1]
+
+        previous = self.environment
+        try:
+            self.environment = environment
+            return body()
+        finally:
+            self.environment = previous
@@ -0,0 +1,390 @@
+from enum import Enum
+
+from .chunk import OpCode
+from .expr import Expr, Get
+from .stmt import Stmt
+from .token import TokenType
+from .vm import VMFunction
+
+class FunctionKind(Enum):
+    SCRIPT = 0,
+    FUNCTION = 1,
+    METHOD = 2,
+    INITIALIZER = 3,
+
+class Local:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.is_captured = False
+
+class FunctionState:
+    def __init__(self, enclosing, function, kind):
+        self.enclosing = enclosing
+        self.function = function
+        self.kind = kind
+        self.upvalues = []
+        self.scope_depth = 0
+
+        # Slot zero holds the callee itself, or the receiver for methods.
+        if kind in (FunctionKind.METHOD, FunctionKind.INITIALIZER):
+            self.locals = [Local("this", 0)]
+        else:
+            self.locals = [Local("", 0)]
+
+class Compiler(Expr, Stmt):
+    """Compiles resolved statements into a chunk of bytecode for the VM."""
+
+    def __init__(self, lox):
+        self.lox = lox
+        self.state = None
+        self._token = None
+
+    def compile(self, statements):
+        self.state = FunctionState(None, VMFunction("script"), FunctionKind.SCRIPT)
+        for statement in statements:
+            self._compile(statement)
+
+        self._emit_return()
+        return self.state.function
+
+    @property
+    def _chunk(self):
+        return self.state.function.chunk
+
+    def _compile(self, node):
+        node.accept(self)
+
+    def _emit(self, *code):
+        for byte in code:
+            self._chunk.write(byte, self._token)
+
+    def _emit_constant(self, value):
+        self._emit(OpCode.CONSTANT, self._chunk.add_constant(value))
+
+    def _emit_jump(self, op):
+        self._emit(op, 0)
+        return len(self._chunk.code) - 1
+
+    def _patch_jump(self, offset):
+        self._chunk.code[offset] = len(self._chunk.code) - offset - 1
+
+    def _emit_loop(self, loop_start):
+        self._emit(OpCode.LOOP, 0)
+        self._chunk.code[-1] = len(self._chunk.code) - loop_start
+
+    def _emit_return(self):
+        if self.state.kind == FunctionKind.INITIALIZER:
+            self._emit(OpCode.GET_LOCAL, 0)
+        else:
+            self._emit(OpCode.NIL)
+
+        self._emit(OpCode.RETURN)
+
+    def _begin_scope(self):
+        self.state.scope_depth += 1
+
+    def _end_scope(self):
+        state = self.state
+        state.scope_depth -= 1
+
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            if state.locals[-1].is_captured:
+                self._emit(OpCode.CLOSE_UPVALUE)
+            else:
+                self._emit(OpCode.POP)
+            state.locals.pop()
+
+    def _declare(self, name):
+        if self.state.scope_depth == 0:
+            return
+
+        self.state.locals.append(Local(name, self.state.scope_depth))
+
+    def _define(self, name):
+        if self.state.scope_depth == 0:
+            self._emit(OpCode.DEFINE_GLOBAL, self._chunk.add_constant(name))
+
+    def _resolve_local(self, state, name):
+        for i in range(len(state.locals) - 1, -1, -1):
+            if state.locals[i].name == name:
+                return i
+
+        return None
+
+    def _add_upvalue(self, state, index, is_local):
+        for i, upvalue in enumerate(state.upvalues):
+            if upvalue == (index, is_local):
+                return i
+
+        state.upvalues.append((index, is_local))
+        state.function.upvalue_count = len(state.upvalues)
+        return len(state.upvalues) - 1
+
+    def _resolve_upvalue(self, state, name):
+        if state.enclosing is None:
+            return None
+
+        local = self._resolve_local(state.enclosing, name)
+        if local is not None:
+            state.enclosing.locals[local].is_captured = True
+            return self._add_upvalue(state, local, True)
+
+        upvalue = self._resolve_upvalue(state.enclosing, name)
+        if upvalue is not None:
+            return self._add_upvalue(state, upvalue, False)
+
+        return None
+
+    def _named_variable(self, name, assign=None):
+        arg = self._resolve_local(self.state, name)
+        if arg is not None:
+            get_op, set_op = OpCode.GET_LOCAL, OpCode.SET_LOCAL
+        else:
+            arg = self._resolve_upvalue(self.state, name)
+            if arg is not None:
+                get_op, set_op = OpCode.GET_UPVALUE, OpCode.SET_UPVALUE
+            else:
+                arg = self._chunk.add_constant(name)
+                get_op, set_op = OpCode.GET_GLOBAL, OpCode.SET_GLOBAL
+
+        if assign is not None:
+            self._compile(assign)
+            self._emit(set_op, arg)
+        else:
+            self._emit(get_op, arg)
+
+    def _function(self, stmt, kind):
+        self.state = FunctionState(
+            self.state, VMFunction(stmt.name.lexeme, len(stmt.params)), kind)
+        self._begin_scope()
+
+        for param in stmt.params:
+            self._declare(param.lexeme)
+
+        for statement in stmt.body:
+            self._compile(statement)
+
+        self._token = None
+        self._emit_return()
+
+        state = self.state
+        self.state = state.enclosing
+        self._token = stmt.name
+        self._emit(OpCode.CLOSURE, self._chunk.add_constant(state.function))
+        for index, is_local in state.upvalues:
+            self._emit(1 if is_local else 0, index)
+
+    def visit_expression_stmt(self, stmt):
+        self._compile(stmt.expression)
+        self._emit(OpCode.POP)
+
+    def visit_print_stmt(self, stmt):
+        self._compile(stmt.expression)
+        self._emit(OpCode.PRINT)
+
+    def visit_var_stmt(self, stmt):
+        self._token = stmt.name
+        if stmt.initializer is not None:
+            self._compile(stmt.initializer)
+        else:
+            self._emit(OpCode.NIL)
+
+        self._token = stmt.name
+        self._declare(stmt.name.lexeme)
+        self._define(stmt.name.lexeme)
+
+    def visit_block_stmt(self, stmt):
+        self._begin_scope()
+        for statement in stmt.statements:
+            self._compile(statement)
+        self._end_scope()
+
+    def visit_if_stmt(self, stmt):
+        self._compile(stmt.condition)
+        then_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._compile(stmt.then_branch)
+
+        else_jump = self._emit_jump(OpCode.JUMP)
+        self._patch_jump(then_jump)
+        self._emit(OpCode.POP)
+
+        if stmt.else_branch:
+            self._compile(stmt.else_branch)
+        self._patch_jump(else_jump)
+
+    def visit_while_stmt(self, stmt):
+        loop_start = len(self._chunk.code)
+        self._compile(stmt.condition)
+
+        exit_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._compile(stmt.body)
+        self._emit_loop(loop_start)
+
+        self._patch_jump(exit_jump)
+        self._emit(OpCode.POP)
+
+    def visit_function_stmt(self, stmt):
+        # Declared before the body so the function can refer to itself.
+        self._token = stmt.name
+        self._declare(stmt.name.lexeme)
+        self._function(stmt, FunctionKind.FUNCTION)
+        self._define(stmt.name.lexeme)
+
+    def visit_return_stmt(self, stmt):
+        self._token = stmt.keyword
+        if stmt.value is None:
+            self._emit_return()
+            return
+
+        self._compile(stmt.value)
+        self._token = stmt.keyword
+        self._emit(OpCode.RETURN)
+
+    def visit_class_stmt(self, stmt):
+        if stmt.superclass is not None:
+            self._compile(stmt.superclass)
+
+        self._token = stmt.name
+        name = stmt.name.lexeme
+        self._emit(OpCode.CLASS, self._chunk.add_constant(name))
+        if stmt.superclass is not None:
+            self._token = stmt.superclass.name
+            self._emit(OpCode.INHERIT)
+
+        self._token = stmt.name
+        self._declare(name)
+        self._define(name)
+
+        if stmt.superclass is not None:
+            self._begin_scope()
+            self._compile(stmt.superclass)
+            self._declare("super")
+
+        self._named_variable(name)
+        for method in stmt.methods:
+            kind = FunctionKind.METHOD
+            if method.name.lexeme == "init":
+                kind = FunctionKind.INITIALIZER
+            self._function(method, kind)
+            self._emit(OpCode.METHOD, self._chunk.add_constant(method.name.lexeme))
+        self._emit(OpCode.POP)
+
+        if stmt.superclass is not None:
+            self._end_scope()
+
+    def visit_literal_expr(self, expr):
+        if expr.value is None:
+            self._emit(OpCode.NIL)
+        elif expr.value is True:
+            self._emit(OpCode.TRUE)
+        elif expr.value is False:
+            self._emit(OpCode.FALSE)
+        else:
+            self._emit_constant(expr.value)
+
+    def visit_grouping_expr(self, expr):
+        self._compile(expr.expression)
+
+    def visit_unary_expr(self, expr):
+        self._compile(expr.right)
+
+        self._token = expr.operator
+        if expr.operator.token_type == TokenType.MINUS:
+            self._emit(OpCode.NEGATE)
+        else:
+            self._emit(OpCode.NOT)
+
+    _BINARY_OPS = {
+        TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+        TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+        TokenType.GREATER: OpCode.GREATER,
+        TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+        TokenType.LESS: OpCode.LESS,
+        TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+        TokenType.PLUS: OpCode.ADD,
+        TokenType.MINUS: OpCode.SUBTRACT,
+        TokenType.STAR: OpCode.MULTIPLY,
+        TokenType.SLASH: OpCode.DIVIDE,
+    }
+
+    def visit_binary_expr(self, expr):
+        self._compile(expr.left)
+        self._compile(expr.right)
+
+        self._token = expr.operator
+        self._emit(self._BINARY_OPS[expr.operator.token_type])
+
+    def visit_logical_expr(self, expr):
+        self._compile(expr.left)
+
+        self._token = expr.operator
+        if expr.operator.token_type == TokenType.OR:
+            else_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+            end_jump = self._emit_jump(OpCode.JUMP)
+            self._patch_jump(else_jump)
+            self._emit(OpCode.POP)
+            self._compile(expr.right)
+            self._patch_jump(end_jump)
+        else:
+            end_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+            self._emit(OpCode.POP)
+            self._compile(expr.right)
+            self._patch_jump(end_jump)
+
+    def visit_variable_expr(self, expr):
+        self._token = expr.name
+        self._named_variable(expr.name.lexeme)
+
+    def visit_assign_expr(self, expr):
+        self._token = expr.name
+        self._named_variable(expr.name.lexeme, expr.value)
+
+    def visit_this_expr(self, expr):
+        self._token = expr.keyword
+        self._named_variable("this")
+
+    def visit_super_expr(self, expr):
+        self._token = expr.keyword
+        self._named_variable("this")
+        self._named_variable("super")
+
+        self._token = expr.method
+        self._emit(OpCode.GET_SUPER, self._chunk.add_constant(expr.method.lexeme))
+
+    def visit_call_expr(self, expr):
+        callee = expr.callee
+        if isinstance(callee, Get):
+            # The method is looked up before the arguments are evaluated, so
+            # a missing property fails exactly where the tree-walker does.
+            self._compile(callee.object_)
+            self._token = callee.name
+            self._emit(OpCode.GET_METHOD, self._chunk.add_constant(callee.name.lexeme))
+            for argument in expr.arguments:
+                self._compile(argument)
+
+            self._token = expr.paren
+            self._emit(OpCode.CALL_METHOD, len(expr.arguments))
+            return
+
+        self._compile(callee)
+        for argument in expr.arguments:
+            self._compile(argument)
+
+        self._token = expr.paren
+        self._emit(OpCode.CALL, len(expr.arguments))
+
+    def visit_get_expr(self, expr):
+        self._compile(expr.object_)
+
+        self._token = expr.name
+        self._emit(OpCode.GET_PROPERTY, self._chunk.add_constant(expr.name.lexeme))
+
+    def visit_set_expr(self, expr):
+        self._compile(expr.object_)
+        self._compile(expr.value)
+
+        self._token = expr.name
+        self._emit(OpCode.SET_PROPERTY, self._chunk.add_constant(expr.name.lexeme))
@@ -2,42 +2,81 @@ from .token import Token
 from .exception import RuntimeException
 
 class Environment:
-    def __init__(self, enclosing=None):
-        self.values = { }
-        self.enclosing = enclosing
+    """A local scope whose variables live in a list.
 
-    def get(self, name : Token):
-        if name.lexeme in self.values:
-            return self.values[name.lexeme]
+    The Resolver gives every local a slot, numbered in declaration order
+    within its scope, so `define` appends and lookups are `(distance, slot)`.
+    """
 
-        if self.enclosing != None:
-            return self.enclosing.get(name)
+    __slots__ = ("values", "enclosing")
 
-        raise RuntimeException(name, f"Undefined variable '{name.lexeme}'.")
+    def __init__(self, enclosing=None, values=None):
+        self.values = [] if values is None else values
+        self.enclosing = enclosing
 
-    def get_at(self, distance, name):
-        return self._ancestor(distance).values.get(name)
+    def get_at(self, distance, slot):
+        environment = self
+        for _ in range(distance):
+            environment = environment.enclosing
+
+        return environment.values[slot]
 
     def define(self, name, value):
-        self.values[name] = value
+        self.values.append(value)
 
-    def assign(self, name : Token, value : any):
-        if name.lexeme in self.values:
-            self.define(name.lexeme, value)
-            return
+    def assign_at(self, distance, slot, value):
+        environment = self
+        for _ in range(distance):
+            environment = environment.enclosing
 
-        if self.enclosing != None:
-            self.enclosing.assign(name, value)
-            return
+        environment.values[slot] = value
 
-        raise RuntimeException(name, f"Undefined variable '{name.lexeme}'.")
+class Cell:
+    """Holds a local that a nested function captures.
 
-    def assign_at(self, distance, name : Token, value):
-        self._ancestor(distance).values[name.lexeme] = value
+    The declaring scope and every closure that captures the local share
+    the Cell, so an assignment through any of them is seen by all.
+    """
 
-    def _ancestor(self, distance):
-        environment = self
-        for _ in range(distance):
-            environment = environment.enclosing
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+UNDEFINED = object()
+
+class GlobalCell:
+    """Holds the value of one global. UNDEFINED until the global is defined."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = UNDEFINED
+
+class GlobalEnvironment:
+    """The outermost scope, a table of one cell per global name.
+
+    A Variable or Assign site that names a global looks its cell up once and
+    keeps it. Defining the global again, as the REPL does, stores into the
+    same cell, so every cached site sees the new value.
+    """
+
+    def __init__(self):
+        self.cells = { }
+        self.enclosing = None
+
+    def cell(self, name):
+        cell = self.cells.get(name)
+        if cell is None:
+            cell = self.cells[name] = GlobalCell()
+
+        return cell
+
+    def define(self, name, value):
+        self.cell(name).value = value
+
+    def assign_cell(self, cell, name : Token, value):
+        if cell.value is UNDEFINED:
+            raise RuntimeException(name, f"Undefined variable '{name.lexeme}'.")
 
-        return environment
+        cell.value = value
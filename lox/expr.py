@@ -1,7 +1,119 @@
+from .token import TokenType
+
 class Expr():
     def accept(self, visitor):
         return getattr(self, f'visit_{type(visitor).__name__.lower()}_expr')(visitor)
 
+    # Operator-specialized nodes dispatch to their own visit method. A visitor
+    # that doesn't care about the operator inherits these and handles them
+    # as the generic Binary, Unary or Logical node.
+    def visit_add_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_subtract_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_multiply_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_divide_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_greater_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_greater_equal_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_less_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_less_equal_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_equal_equal_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_bang_equal_expr(self, expr):
+        return self.visit_binary_expr(expr)
+
+    def visit_negate_expr(self, expr):
+        return self.visit_unary_expr(expr)
+
+    def visit_not_expr(self, expr):
+        return self.visit_unary_expr(expr)
+
+    def visit_and_expr(self, expr):
+        return self.visit_logical_expr(expr)
+
+    def visit_or_expr(self, expr):
+        return self.visit_logical_expr(expr)
+
+    def visit_inline_expr(self, expr):
+        return self.visit_call_expr(expr)
+
+    def visit_invoke_expr(self, expr):
+        return self.visit_call_expr(expr)
+
+    # Operators whose operands are proven to be numbers.
+    def visit_number_add_expr(self, expr):
+        return self.visit_add_expr(expr)
+
+    def visit_number_subtract_expr(self, expr):
+        return self.visit_subtract_expr(expr)
+
+    def visit_number_multiply_expr(self, expr):
+        return self.visit_multiply_expr(expr)
+
+    def visit_number_divide_expr(self, expr):
+        return self.visit_divide_expr(expr)
+
+    def visit_number_greater_expr(self, expr):
+        return self.visit_greater_expr(expr)
+
+    def visit_number_greater_equal_expr(self, expr):
+        return self.visit_greater_equal_expr(expr)
+
+    def visit_number_less_expr(self, expr):
+        return self.visit_less_expr(expr)
+
+    def visit_number_less_equal_expr(self, expr):
+        return self.visit_less_equal_expr(expr)
+
+    def visit_number_negate_expr(self, expr):
+        return self.visit_negate_expr(expr)
+
+    # Nodes quickened at run time from the types they have seen.
+    def visit_float_add_expr(self, expr):
+        return self.visit_add_expr(expr)
+
+    def visit_float_subtract_expr(self, expr):
+        return self.visit_subtract_expr(expr)
+
+    def visit_float_multiply_expr(self, expr):
+        return self.visit_multiply_expr(expr)
+
+    def visit_float_divide_expr(self, expr):
+        return self.visit_divide_expr(expr)
+
+    def visit_float_greater_expr(self, expr):
+        return self.visit_greater_expr(expr)
+
+    def visit_float_greater_equal_expr(self, expr):
+        return self.visit_greater_equal_expr(expr)
+
+    def visit_float_less_expr(self, expr):
+        return self.visit_less_expr(expr)
+
+    def visit_float_less_equal_expr(self, expr):
+        return self.visit_less_equal_expr(expr)
+
+    def visit_field_get_expr(self, expr):
+        return self.visit_get_expr(expr)
+
+    def visit_function_call_expr(self, expr):
+        return self.visit_call_expr(expr)
+
 class Assign(Expr):
     def __init__(self, name, value):
         self.name = name
@@ -24,6 +136,8 @@ class Call(Expr):
         self.callee = callee
         self.paren = paren
         self.arguments = arguments
+        # The site's CallCache, made the first time it runs.
+        self.cache = None
 
     def accept(self, visitor):
         return visitor.visit_call_expr(self)
@@ -32,6 +146,8 @@ class Get(Expr):
     def __init__(self, object_, name):
         self.object_ = object_
         self.name = name
+        # The site's PropertyCache, made the first time it runs.
+        self.cache = None
 
     def accept(self, visitor):
         return visitor.visit_get_expr(self)
@@ -64,6 +180,8 @@ class Set(Expr):
         self.object_ = object_
         self.name = name
         self.value = value
+        # The site's PropertyCache, made the first time it runs.
+        self.cache = None
 
     def accept(self, visitor):
         return visitor.visit_set_expr(self)
@@ -97,3 +215,226 @@ class Variable(Expr):
 
     def accept(self, visitor):
         return visitor.visit_variable_expr(self)
+
+class Add(Binary):
+    def accept(self, visitor):
+        return visitor.visit_add_expr(self)
+
+class Subtract(Binary):
+    def accept(self, visitor):
+        return visitor.visit_subtract_expr(self)
+
+class Multiply(Binary):
+    def accept(self, visitor):
+        return visitor.visit_multiply_expr(self)
+
+class Divide(Binary):
+    def accept(self, visitor):
+        return visitor.visit_divide_expr(self)
+
+class Greater(Binary):
+    def accept(self, visitor):
+        return visitor.visit_greater_expr(self)
+
+class GreaterEqual(Binary):
+    def accept(self, visitor):
+        return visitor.visit_greater_equal_expr(self)
+
+class Less(Binary):
+    def accept(self, visitor):
+        return visitor.visit_less_expr(self)
+
+class LessEqual(Binary):
+    def accept(self, visitor):
+        return visitor.visit_less_equal_expr(self)
+
+class EqualEqual(Binary):
+    def accept(self, visitor):
+        return visitor.visit_equal_equal_expr(self)
+
+class BangEqual(Binary):
+    def accept(self, visitor):
+        return visitor.visit_bang_equal_expr(self)
+
+class Negate(Unary):
+    def accept(self, visitor):
+        return visitor.visit_negate_expr(self)
+
+class Not(Unary):
+    def accept(self, visitor):
+        return visitor.visit_not_expr(self)
+
+class And(Logical):
+    def accept(self, visitor):
+        return visitor.visit_and_expr(self)
+
+class Or(Logical):
+    def accept(self, visitor):
+        return visitor.visit_or_expr(self)
+
+class NumberAdd(Add):
+    def accept(self, visitor):
+        return visitor.visit_number_add_expr(self)
+
+class NumberSubtract(Subtract):
+    def accept(self, visitor):
+        return visitor.visit_number_subtract_expr(self)
+
+class NumberMultiply(Multiply):
+    def accept(self, visitor):
+        return visitor.visit_number_multiply_expr(self)
+
+class NumberDivide(Divide):
+    def accept(self, visitor):
+        return visitor.visit_number_divide_expr(self)
+
+class NumberGreater(Greater):
+    def accept(self, visitor):
+        return visitor.visit_number_greater_expr(self)
+
+class NumberGreaterEqual(GreaterEqual):
+    def accept(self, visitor):
+        return visitor.visit_number_greater_equal_expr(self)
+
+class NumberLess(Less):
+    def accept(self, visitor):
+        return visitor.visit_number_less_expr(self)
+
+class NumberLessEqual(LessEqual):
+    def accept(self, visitor):
+        return visitor.visit_number_less_equal_expr(self)
+
+class NumberNegate(Negate):
+    def accept(self, visitor):
+        return visitor.visit_number_negate_expr(self)
+
+# The check-free variant of each operator, for operands proven to be numbers.
+NUMBER_OPERATIONS = {
+    Add: NumberAdd,
+    Subtract: NumberSubtract,
+    Multiply: NumberMultiply,
+    Divide: NumberDivide,
+    Greater: NumberGreater,
+    GreaterEqual: NumberGreaterEqual,
+    Less: NumberLess,
+    LessEqual: NumberLessEqual,
+    Negate: NumberNegate,
+}
+
+class FloatAdd(Add):
+    def accept(self, visitor):
+        return visitor.visit_float_add_expr(self)
+
+class FloatSubtract(Subtract):
+    def accept(self, visitor):
+        return visitor.visit_float_subtract_expr(self)
+
+class FloatMultiply(Multiply):
+    def accept(self, visitor):
+        return visitor.visit_float_multiply_expr(self)
+
+class FloatDivide(Divide):
+    def accept(self, visitor):
+        return visitor.visit_float_divide_expr(self)
+
+class FloatGreater(Greater):
+    def accept(self, visitor):
+        return visitor.visit_float_greater_expr(self)
+
+class FloatGreaterEqual(GreaterEqual):
+    def accept(self, visitor):
+        return visitor.visit_float_greater_equal_expr(self)
+
+class FloatLess(Less):
+    def accept(self, visitor):
+        return visitor.visit_float_less_expr(self)
+
+class FloatLessEqual(LessEqual):
+    def accept(self, visitor):
+        return visitor.visit_float_less_equal_expr(self)
+
+class FieldGet(Get):
+    def accept(self, visitor):
+        return visitor.visit_field_get_expr(self)
+
+class FunctionCall(Call):
+    def accept(self, visitor):
+        return visitor.visit_function_call_expr(self)
+
+# The variant a node is quickened to once it has only seen float operands,
+# instance fields or Lox functions. Deoptimizing switches it back.
+QUICKENED = {
+    Add: FloatAdd,
+    Subtract: FloatSubtract,
+    Multiply: FloatMultiply,
+    Divide: FloatDivide,
+    Greater: FloatGreater,
+    GreaterEqual: FloatGreaterEqual,
+    Less: FloatLess,
+    LessEqual: FloatLessEqual,
+    Get: FieldGet,
+    Call: FunctionCall,
+}
+GENERIC = {quickened: generic for generic, quickened in QUICKENED.items()}
+
+class Inline(Call):
+    """A call of a small top-level function, with the function's return
+    expression copied in. Visitors that don't inline treat it as a Call."""
+
+    def __init__(self, callee, paren, arguments, declaration, body):
+        super().__init__(callee, paren, arguments)
+        self.declaration = declaration
+        self.body = body
+
+    def accept(self, visitor):
+        return visitor.visit_inline_expr(self)
+
+class Invoke(Call):
+    """A call of a property, `object.name(arguments)`. The parser makes one
+    for every call whose callee is a Get; visitors that don't care treat it
+    as a Call."""
+
+    def accept(self, visitor):
+        return visitor.visit_invoke_expr(self)
+
+class Argument(Expr):
+    """A parameter reference inside an Inline body."""
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+
+    def accept(self, visitor):
+        return visitor.visit_argument_expr(self)
+
+SPECIALIZED = {
+    Binary: {
+        TokenType.PLUS: Add,
+        TokenType.MINUS: Subtract,
+        TokenType.STAR: Multiply,
+        TokenType.SLASH: Divide,
+        TokenType.GREATER: Greater,
+        TokenType.GREATER_EQUAL: GreaterEqual,
+        TokenType.LESS: Less,
+        TokenType.LESS_EQUAL: LessEqual,
+        TokenType.EQUAL_EQUAL: EqualEqual,
+        TokenType.BANG_EQUAL: BangEqual,
+    },
+    Unary: {
+        TokenType.MINUS: Negate,
+        TokenType.BANG: Not,
+    },
+    Logical: {
+        TokenType.AND: And,
+        TokenType.OR: Or,
+    },
+}
+
+def specialize(expr):
+    """Turns a generic Binary, Unary or Logical node into the node class for
+    its operator, in place, so the node keeps its identity in `locals`."""
+    operators = SPECIALIZED.get(type(expr))
+    if operators is not None:
+        expr.__class__ = operators[expr.operator.token_type]
+
+    return expr
@@ -0,0 +1,31 @@
+import sys
+
+class FramePool:
+    """Bounded free lists of Environments for call and block scopes.
+
+    Closures hold the Cells of the variables they capture and bound methods
+    their own scope for `this`, never the scope of a running call or block.
+    Nothing refers to such a scope once the call returns or the block ends,
+    so it goes back on a free list and the next call or block takes it
+    instead of allocating. A block scope keeps its emptied list of values.
+    At most `size` scopes of each kind are kept. A scope left by a runtime
+    error is simply not returned.
+
+    Calling methods costs more than allocating an Environment saves, so the
+    engines take and return scopes inline.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.frames = []
+        self.blocks = []
+        self.allocated = 0
+        self.reused = 0
+        self.dropped = 0
+
+    def report(self, file=sys.stderr):
+        acquired = self.allocated + self.reused
+        rate = f"{100 * self.reused / acquired:.1f}%" if acquired else "-"
+        print(f"frame pool: {acquired} scope(s), {self.reused} reused ({rate}), "
+              f"{self.allocated} allocated, {self.dropped} dropped (size {self.size})",
+              file=file)
@@ -0,0 +1,51 @@
+import gc
+import sys
+import time
+
+class GCMonitor:
+    """Counts and times the runs of Python's cyclic garbage collector.
+
+    Registers itself in `gc.callbacks`, which Python calls at the start and
+    end of every collection. `freeze` moves every object the collector
+    tracks so far, such as the parsed and resolved program, into the
+    permanent generation, so later collections don't traverse it again.
+    """
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.collected = 0
+        self.uncollectable = 0
+        self.paused = 0.0
+        self.longest = 0.0
+        self.frozen = 0
+        self._start = None
+        gc.callbacks.append(self._callback)
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+            return
+
+        pause = time.perf_counter() - self._start
+        self.collections[info["generation"]] += 1
+        self.collected += info["collected"]
+        self.uncollectable += info["uncollectable"]
+        self.paused += pause
+        self.longest = max(self.longest, pause)
+
+    def freeze(self):
+        gc.freeze()
+        self.frozen = gc.get_freeze_count()
+
+    def close(self):
+        gc.callbacks.remove(self._callback)
+
+    def report(self, file=sys.stderr):
+        young, middle, old = self.collections
+        print(f"gc: {young + middle + old} collection(s) "
+              f"(generation 0: {young}, 1: {middle}, 2: {old}), "
+              f"{self.collected} object(s) collected, "
+              f"{1000 * self.paused:.1f} ms paused, longest {1000 * self.longest:.1f} ms",
+              file=file)
+        if self.frozen:
+            print(f"  {self.frozen} object(s) frozen before running", file=file)
@@ -0,0 +1,100 @@
+import sys
+
+# Shapes a site remembers before it stops caching new ones.
+MAX_ENTRIES = 4
+
+class PropertyCache:
+    """Remembers how one Get or Set site resolved its property, per shape.
+
+    A shape belongs to a single class and fixes the index of every field
+    its instances have, so it is the whole key: a Get entry holds the
+    field's index or the method found on the class, a Set entry the
+    field's index or the shape an instance moves to when it adds the
+    field. A class declaration that runs again creates a new class with
+    new shapes, which never match the entries made for the old one.
+
+    A site that meets one shape is monomorphic, one that meets up to
+    MAX_ENTRIES is polymorphic, and beyond that it is megamorphic: later
+    shapes take the full lookup every time and count as misses.
+    """
+
+    __slots__ = ("name", "entries", "hits", "misses", "megamorphic")
+
+    def __init__(self, name):
+        self.name = name
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.megamorphic = False
+
+    def get(self, instance):
+        index, method = self._lookup(instance)
+        if method is None:
+            return instance.values[index]
+        return method.bind(instance)
+
+    def method(self, instance):
+        """Returns the unbound method the property names, or None when an
+        instance field shadows it."""
+        return self._lookup(instance)[1]
+
+    def _lookup(self, instance):
+        entry = self.entries.get(instance.shape)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        index = instance.shape.slots.get(self.name.lexeme)
+        if index is not None:
+            entry = (index, None)
+        else:
+            method = instance.klass.find_method(self.name.lexeme)
+            if method is None:
+                # Reports the undefined property.
+                instance.get(self.name)
+            entry = (None, method)
+        self._remember(instance.shape, entry)
+        return entry
+
+    def set(self, instance, value):
+        entry = self.entries.get(instance.shape)
+        if entry is not None:
+            self.hits += 1
+            index, shape = entry
+            if shape is None:
+                instance.values[index] = value
+            else:
+                instance.shape = shape
+                instance.values.append(value)
+            return
+
+        self.misses += 1
+        previous = instance.shape
+        index = previous.slots.get(self.name.lexeme)
+        if index is not None:
+            self._remember(previous, (index, None))
+            instance.values[index] = value
+        else:
+            instance.set(self.name, value)
+            self._remember(previous, (None, instance.shape))
+
+    def _remember(self, shape, entry):
+        if len(self.entries) < MAX_ENTRIES:
+            self.entries[shape] = entry
+        else:
+            self.megamorphic = True
+
+def report(caches, file=sys.stderr):
+    hits = sum(cache.hits for cache in caches)
+    misses = sum(cache.misses for cache in caches)
+    kinds = {"monomorphic": 0, "polymorphic": 0, "megamorphic": 0}
+    for cache in caches:
+        if cache.megamorphic:
+            kinds["megamorphic"] += 1
+        elif len(cache.entries) > 1:
+            kinds["polymorphic"] += 1
+        elif cache.entries:
+            kinds["monomorphic"] += 1
+    print(f"inline caches: {len(caches)} site(s), {hits} hits, {misses} misses; "
+          + ", ".join(f"{count} {kind}" for kind, count in kinds.items()), file=file)
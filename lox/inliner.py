@@ -0,0 +1,104 @@
+import copy
+import sys
+
+from .expr import Argument, Assign, Call, Expr, Inline, Variable
+from .stmt import Function, Return, Stmt, walk
+
+class Inliner:
+    """Replaces calls of small top-level functions with their return expression.
+
+    A function declared at the top level of the script is a candidate when
+    its body is a single `return expr;`, the expression has at most
+    `max_size` nodes, never assigns a parameter and doesn't call the
+    function itself. A call whose callee is the function's global name
+    becomes an Inline node carrying a copy of the expression, in which
+    every parameter reads the call's argument values.
+
+    The global can be reassigned at run time, so the engines check that the
+    callee still is a Loxfunction made from the inlined declaration and
+    fall back to an ordinary call otherwise.
+    """
+
+    def __init__(self, interpreter, max_size=16):
+        self.interpreter = interpreter
+        self.locals = interpreter.locals
+        self.max_size = max_size
+        self.candidates = {}
+        self.inlined = []
+
+    def inline(self, statements):
+        for statement in statements:
+            if isinstance(statement, Function):
+                body = self._candidate_body(statement)
+                if body is not None:
+                    self.candidates[statement.name.lexeme] = (statement, body)
+                else:
+                    self.candidates.pop(statement.name.lexeme, None)
+
+        if self.candidates:
+            statements = [self._rewrite(statement) for statement in statements]
+        return statements
+
+    def _candidate_body(self, declaration):
+        if len(declaration.body) != 1 or not isinstance(declaration.body[0], Return):
+            return None
+
+        expr = declaration.body[0].value
+        if expr is None:
+            return None
+
+        nodes = list(walk(expr))
+        if len(nodes) > self.max_size:
+            return None
+
+        for node in nodes:
+            if isinstance(node, Assign) and node in self.locals:
+                return None
+            if isinstance(node, Call) and isinstance(node.callee, Variable) \
+                    and node.callee.name.lexeme == declaration.name.lexeme:
+                return None
+
+        return self._substitute(expr)
+
+    def _substitute(self, node):
+        # The body is resolved inside the function, where the parameters
+        # are the only locals: every local reference reads an argument.
+        if isinstance(node, Variable) and node in self.locals:
+            return Argument(node.name, self.locals[node][1])
+
+        node = copy.copy(node)
+        for name, value in vars(node).items():
+            if isinstance(value, Expr):
+                setattr(node, name, self._substitute(value))
+            elif isinstance(value, list):
+                setattr(node, name, [self._substitute(item) if isinstance(item, Expr) else item
+                                     for item in value])
+        return node
+
+    def _rewrite(self, node):
+        for name, value in vars(node).items():
+            if isinstance(value, (Expr, Stmt)):
+                setattr(node, name, self._rewrite(value))
+            elif isinstance(value, list):
+                setattr(node, name, [self._rewrite(item) if isinstance(item, (Expr, Stmt)) else item
+                                     for item in value])
+
+        if type(node) is Call and isinstance(node.callee, Variable) \
+                and node.callee not in self.locals:
+            candidate = self.candidates.get(node.callee.name.lexeme)
+            if candidate is not None and len(candidate[0].params) == len(node.arguments):
+                declaration, body = candidate
+                self.inlined.append((declaration, node.paren.line))
+                return Inline(node.callee, node.paren, node.arguments, declaration, body)
+
+        if isinstance(node, Return) and isinstance(node.value, Inline):
+            # Evaluating the body in place beats trampolining the call.
+            self.interpreter.tail_calls.discard(node)
+
+        return node
+
+    def report(self, file=sys.stderr):
+        print(f"inlining: {len(self.inlined)} call site(s) inlined", file=file)
+        for declaration, line in self.inlined:
+            print(f"  <fn {declaration.name.lexeme}> [line {declaration.name.line}] "
+                  f"at line {line}", file=file)
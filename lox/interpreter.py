@@ -1,23 +1,38 @@
 import time
 
 from .loxcallable import LoxCallable
-from .expr import Call, Expr, Logical, Variable
+from .expr import specialize, Call, Expr, Inline, Invoke, Logical, Variable
 from .loxclass import LoxClass
 from .loxfunction import Loxfunction
 from .loxinstance import LoxInstance
+from .memoize import MemoizedFunction
+from .inlinecache import PropertyCache
+from .callcache import CallCache
 from .stmt import Block, If, Stmt, Var, While, Return
-from .token import TokenType
-from .environment import Environment
+from .environment import UNDEFINED, Cell, Environment, GlobalEnvironment
 from .exception import RuntimeException
-from .returnvalue import ReturnValue
+from .returnvalue import RETURN, TAIL_CALL
 
 class Interpreter(Expr, Stmt):
     def __init__(self, lox):
         self.lox = lox
-        self.globals = Environment()
+        self.globals = GlobalEnvironment()
         self.globals.define("clock", Clock())
         self.environment = self.globals
         self.locals = {}
+        self.accesses = {}
+        self.receivers = {}
+        self.global_cells = {}
+        self.tier = None
+        self.frame_pool = None
+        self.current_function = None
+        self.return_value = None
+        self.tail_calls = set()
+        self.tail_call = None
+        self.inline_arguments = None
+        self.memos = {}
+        self.property_caches = []
+        self.call_caches = []
 
     def interpret(self, statements):
         try:
@@ -33,74 +48,214 @@ class Interpreter(Expr, Stmt):
         return self._evaluate(expr.expression)
 
     def visit_unary_expr(self, expr):
-        right = self._evaluate(expr)
+        # Trees built without the parser hold generic nodes.
+        return specialize(expr).accept(self)
 
-        if expr.operator.token_type == TokenType.MINUS:
-            self._check_number_operand(expr.operator, right)
-            return -float(right)
-        if expr.operator.token_type == TokenType.BANG:
-            return not self._is_thruthy(right)
+    def visit_negate_expr(self, expr):
+        right = self._evaluate(expr.right)
+        if isinstance(right, float):
+            return -right
+
+        raise RuntimeException(expr.operator, "Operand must be a number.")
 
-        # Unreachable code
-        return None
+    def visit_not_expr(self, expr):
+        return not self._is_thruthy(self._evaluate(expr.right))
+
+    def visit_number_negate_expr(self, expr):
+        return -self._evaluate(expr.right)
 
     def visit_binary_expr(self, expr):
+        return specialize(expr).accept(self)
+
+    # Operands proven to be numbers by TypeInference need no checks.
+    def visit_number_add_expr(self, expr):
+        return self._evaluate(expr.left) + self._evaluate(expr.right)
+
+    def visit_number_subtract_expr(self, expr):
+        return self._evaluate(expr.left) - self._evaluate(expr.right)
+
+    def visit_number_multiply_expr(self, expr):
+        return self._evaluate(expr.left) * self._evaluate(expr.right)
+
+    def visit_number_divide_expr(self, expr):
+        return self._evaluate(expr.left) / self._evaluate(expr.right)
+
+    def visit_number_greater_expr(self, expr):
+        return self._evaluate(expr.left) > self._evaluate(expr.right)
+
+    def visit_number_greater_equal_expr(self, expr):
+        return self._evaluate(expr.left) >= self._evaluate(expr.right)
+
+    def visit_number_less_expr(self, expr):
+        return self._evaluate(expr.left) < self._evaluate(expr.right)
+
+    def visit_number_less_equal_expr(self, expr):
+        return self._evaluate(expr.left) <= self._evaluate(expr.right)
+
+    def visit_greater_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left > right
+
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def visit_greater_equal_expr(self, expr):
         left = self._evaluate(expr.left)
         right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left >= right
 
-        if expr.operator.token_type == TokenType.GREATER:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) > float(right)
-        if expr.operator.token_type == TokenType.GREATER_EQUAL:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) >= float(right)
-        if expr.operator.token_type == TokenType.LESS:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) < float(right)
-        if expr.operator.token_type == TokenType.LESS_EQUAL:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) <= float(right)
-        if expr.operator.token_type == TokenType.BANG_EQUAL:
-            return not self._is_equal(left, right)
-        if expr.operator.token_type == TokenType.EQUAL_EQUAL:
-            return self._is_equal(left, right)
-        if expr.operator.token_type == TokenType.MINUS:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) - float(right)
-        if expr.operator.token_type == TokenType.PLUS:
-            if isinstance(left, float) and isinstance(right, float):
-                return float(left) + float(right)
-            if isinstance(left, str) and isinstance(right, str):
-                return str(left) + str(right)
-
-            raise RuntimeException(expr.operator,
-                                    "Operands must be two numbers or two strings.")
-        if expr.operator.token_type == TokenType.SLASH:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) / float(right)
-        if expr.operator.token_type == TokenType.STAR:
-            self._check_number_operands(expr.operator, left, right)
-            return float(left) * float(right)
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def visit_less_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left < right
+
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def visit_less_equal_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left <= right
+
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def visit_bang_equal_expr(self, expr):
+        return not self._is_equal(self._evaluate(expr.left), self._evaluate(expr.right))
+
+    def visit_equal_equal_expr(self, expr):
+        return self._is_equal(self._evaluate(expr.left), self._evaluate(expr.right))
+
+    def visit_subtract_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left - right
+
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def visit_add_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left + right
+        if isinstance(left, str) and isinstance(right, str):
+            return left + right
+
+        raise RuntimeException(expr.operator,
+                                "Operands must be two numbers or two strings.")
+
+    def visit_divide_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left / right
+
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def visit_multiply_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if isinstance(left, float) and isinstance(right, float):
+            return left * right
+
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
 
     def visit_assign_expr(self, expr):
         value = self._evaluate(expr.value)
 
-        distance = self.locals[expr] if expr in self.locals else None
+        access = self.accesses.get(expr)
 
-        if distance != None:
-            self.environment.assign_at(distance, expr.name, value)
+        if access is not None:
+            distance, slot, boxed = access
+            if boxed:
+                self.environment.get_at(distance, slot).value = value
+            else:
+                self.environment.assign_at(distance, slot, value)
         else:
-            self.globals.assign(expr.name, value)
+            cell = self.global_cells.get(expr) or self._global_cell(expr, expr.name)
+            self.globals.assign_cell(cell, expr.name, value)
 
         return value
 
     def visit_call_expr(self, expr : Call):
+        return self._finish_call(expr, self._evaluate(expr.callee))
+
+    def visit_invoke_expr(self, expr : Invoke):
+        get = expr.callee
+        obj = self._evaluate(get.object_)
+        if not isinstance(obj, LoxInstance):
+            raise RuntimeException(get.name, "Only instances have properties.")
+
+        cache = get.cache or self._property_cache(get)
+        method = cache.method(obj)
+        if method is None:
+            # A field holding something callable.
+            return self._finish_call(expr, cache.get(obj))
+
+        arguments = []
+        for argument in expr.arguments:
+            arguments.append(self._evaluate(argument))
+
+        if len(arguments) != method.arity:
+            raise RuntimeException(expr.paren,
+                                   f"Expected {method.arity} arguments but got {len(arguments)}.")
+        try:
+            return method.__call__(self, arguments, obj)
+        except RecursionError:
+            raise RuntimeException(expr.paren, "Stack overflow.") from None
+
+    def visit_inline_expr(self, expr : Inline):
         callee = self._evaluate(expr.callee)
+        if type(callee) is not Loxfunction or callee.declaration is not expr.declaration:
+            # The global was reassigned since the call was inlined, or the
+            # function is memoized and answers from its memo.
+            return self._finish_call(expr, callee)
+
+        arguments = [self._evaluate(argument) for argument in expr.arguments]
+        previous = self.inline_arguments
+        self.inline_arguments = arguments
+        value = self._evaluate(expr.body)
+        self.inline_arguments = previous
+        return value
+
+    def visit_argument_expr(self, expr):
+        return self.inline_arguments[expr.index]
 
+    def _finish_call(self, expr, callee):
         arguments = []
         for argument in expr.arguments:
             arguments.append(self._evaluate(argument))
 
+        cache = expr.cache or self._call_cache(expr)
+        if callee is cache.callee:
+            cache.hits += 1
+            if len(arguments) != cache.arity:
+                raise RuntimeException(expr.paren,
+                                       f"Expected {cache.arity} arguments but got {len(arguments)}.")
+            invoke = cache.invoke
+        else:
+            self._check_call(expr, callee, arguments)
+            invoke = cache.update(callee)
+
+        try:
+            return invoke(callee, self, arguments)
+        except RecursionError:
+            # Each Lox call takes several Python frames; report running out
+            # of them as a Lox error. --engine=vm has no such limit.
+            raise RuntimeException(expr.paren, "Stack overflow.") from None
+
+    def _call_cache(self, expr):
+        if expr.cache is None:
+            expr.cache = CallCache()
+            self.call_caches.append(expr.cache)
+        return expr.cache
+
+    def _check_call(self, expr, callee, arguments):
         if not isinstance(callee, LoxCallable):
             raise RuntimeException(
                 expr.paren, "Can only call functions and classes.")
@@ -109,26 +264,35 @@ class Interpreter(Expr, Stmt):
             raise RuntimeException(expr.paren,
                                     f"Expected {callee.arity} arguments but got {len(arguments)}.")
 
-        return callee.__call__(self, arguments)
-
     def visit_get_expr(self, expr):
         obj = self._evaluate(expr.object_)
 
         if isinstance(obj, LoxInstance):
-            return obj.get(expr.name)
+            return (expr.cache or self._property_cache(expr)).get(obj)
 
         raise RuntimeException(expr.name,
             "Only instances have properties.")
 
+    def _property_cache(self, expr):
+        if expr.cache is None:
+            expr.cache = PropertyCache(expr.name)
+            self.property_caches.append(expr.cache)
+        return expr.cache
+
     def visit_logical_expr(self, expr : Logical):
+        return specialize(expr).accept(self)
+
+    def visit_or_expr(self, expr):
         left = self._evaluate(expr.left)
+        if self._is_thruthy(left):
+            return left
 
-        if expr.operator.token_type == TokenType.OR:
-            if self._is_thruthy(left):
-                return left
-            else:
-                if self._is_thruthy(left) == False:
-                    return left
+        return self._evaluate(expr.right)
+
+    def visit_and_expr(self, expr):
+        left = self._evaluate(expr.left)
+        if not self._is_thruthy(left):
+            return left
 
         return self._evaluate(expr.right)
 
@@ -139,15 +303,16 @@ class Interpreter(Expr, Stmt):
             raise RuntimeException(expr.name, "Only instances have fields.")
 
         value = self._evaluate(expr.value)
-        obj.set(expr.name, value)
+        (expr.cache or self._property_cache(expr)).set(obj, value)
         return value
 
     def visit_super_expr(self, expr):
-        distance = self.locals.get(expr)
-        super_class = self.environment.get_at(
-            distance, "super")
-        obj = self.environment.get_at(
-            distance - 1, "this")
+        distance, slot, _ = self.accesses[expr]
+        super_class = self.environment.get_at(distance, slot).value
+        distance, slot, boxed = self.receivers[expr]
+        obj = self.environment.get_at(distance, slot)
+        if boxed:
+            obj = obj.value
 
         method = super_class.find_method(expr.method.lexeme)
 
@@ -163,14 +328,53 @@ class Interpreter(Expr, Stmt):
         return self._lookup_variable(expr.name, expr)
 
     def _lookup_variable(self, name, expr):
-        distance = self.locals.get(expr, None)
-        if distance != None:
-            return self.environment.get_at(distance, name.lexeme)
-        else:
-            return self.globals.get(name)
+        access = self.accesses.get(expr)
+        if access is not None:
+            distance, slot, boxed = access
+            value = self.environment.get_at(distance, slot)
+            return value.value if boxed else value
+
+        cell = self.global_cells.get(expr)
+        if cell is None:
+            cell = self._global_cell(expr, name)
+
+        value = cell.value
+        if value is UNDEFINED:
+            raise RuntimeException(name, f"Undefined variable '{name.lexeme}'.")
+        return value
+
+    def _global_cell(self, expr, name):
+        cell = self.global_cells[expr] = self.globals.cell(name.lexeme)
+        return cell
 
     def visit_block_stmt(self, stmt : Block):
-        self.execute_block(stmt.statements, Environment(self.environment))
+        if stmt.scoped:
+            pool = self.frame_pool
+            if pool is None:
+                return self.execute_block(stmt.statements, Environment(self.environment))
+
+            if pool.blocks:
+                pool.reused += 1
+                environment = pool.blocks.pop()
+                environment.enclosing = self.environment
+            else:
+                pool.allocated += 1
+                environment = Environment(self.environment)
+
+            completion = self.execute_block(stmt.statements, environment)
+
+            if len(pool.blocks) < pool.size:
+                environment.values.clear()
+                environment.enclosing = None
+                pool.blocks.append(environment)
+            else:
+                pool.dropped += 1
+            return completion
+
+        for statement in stmt.statements:
+            completion = self._execute(statement)
+            if completion is not None:
+                return completion
 
     def visit_class_stmt(self, stmt):
         super_class = None
@@ -180,16 +384,21 @@ class Interpreter(Expr, Stmt):
                 raise RuntimeException(stmt.superclass.name,
                                        "Superclass must be a class.")
 
-        self.environment.define(stmt.name.lexeme, None)
+        # Methods that use the class name capture its Cell, so the Cell
+        # must be in its slot before they are made.
+        cell = None
+        if stmt.boxed:
+            cell = Cell(None)
+            self.environment.define(stmt.name.lexeme, cell)
 
         if stmt.superclass != None:
             self.environment = Environment(self.environment)
-            self.environment.define("super", super_class)
+            self.environment.define("super", Cell(super_class))
 
         methods = {}
 
         for method in stmt.methods:
-            func = Loxfunction(method, self.environment, method.name.lexeme == "init")
+            func = Loxfunction(method, self.capture(method), method.name.lexeme == "init")
             methods[method.name.lexeme] = func
 
         klass = LoxClass(stmt.name.lexeme, super_class, methods)
@@ -197,7 +406,10 @@ class Interpreter(Expr, Stmt):
         if super_class != None:
             self.environment = self.environment.enclosing
 
-        self.environment.assign(stmt.name, klass)
+        if cell is None:
+            self.environment.define(stmt.name.lexeme, klass)
+        else:
+            cell.value = klass
 
     def visit_expression_stmt(self, stmt):
         self._evaluate(stmt.expression)
@@ -207,41 +419,96 @@ class Interpreter(Expr, Stmt):
         print(self._stringify(value))
 
     def visit_function_stmt(self, stmt):
-        func = Loxfunction(stmt, self.environment, False)
-        self.environment.define(stmt.name.lexeme, func)
+        # A local function that calls itself captures its own Cell.
+        cell = None
+        if stmt.boxed:
+            cell = Cell(None)
+            self.environment.define(stmt.name.lexeme, cell)
+
+        memo = self.memos.get(stmt)
+        if memo is None:
+            func = Loxfunction(stmt, self.capture(stmt), False)
+        else:
+            func = MemoizedFunction(stmt, self.capture(stmt), memo)
+
+        if cell is None:
+            self.environment.define(stmt.name.lexeme, func)
+        else:
+            cell.value = func
+
+    def capture(self, declaration):
+        """Collects the Cells a function declared here captures into its closure."""
+        if not declaration.upvalues:
+            return None
+
+        environment = self.environment
+        return Environment(None, [environment.get_at(distance, slot)
+                                  for distance, slot in declaration.upvalues])
 
     def visit_if_stmt(self, stmt : If):
         if self._is_thruthy(self._evaluate(stmt.condition)):
-            self._execute(stmt.then_branch)
+            return self._execute(stmt.then_branch)
         elif stmt.else_branch:
-            self._execute(stmt.else_branch)
+            return self._execute(stmt.else_branch)
 
     def visit_return_stmt(self, stmt : Return):
+        if stmt in self.tail_calls:
+            return self._tail_call(stmt.value)
+
         value = None;
         if stmt.value:
             value = self._evaluate(stmt.value)
 
-        raise ReturnValue(value)
+        self.return_value = value
+        return RETURN
+
+    def _tail_call(self, expr : Call):
+        callee = self._evaluate(expr.callee)
+        arguments = [self._evaluate(argument) for argument in expr.arguments]
+        self._check_call(expr, callee, arguments)
+
+        if type(callee) is Loxfunction:
+            # Leave the call to the Loxfunction that is returning, which
+            # runs it in place of its own body. A memoized function is
+            # called as usual, so its result is cached.
+            self.tail_call = (callee, arguments)
+            return TAIL_CALL
+
+        self.return_value = callee.__call__(self, arguments)
+        return RETURN
 
     def visit_var_stmt(self, stmt : Var):
         value = None
         if stmt.initializer:
             value = self._evaluate(stmt.initializer)
 
-        self.environment.define(stmt.name.lexeme, value)
+        self.environment.define(stmt.name.lexeme, Cell(value) if stmt.boxed else value)
 
     def visit_while_stmt(self, stmt : While):
         while self._is_thruthy(self._evaluate(stmt.condition)):
-            self._execute(stmt.body)
+            completion = self._execute(stmt.body)
+            if completion is not None:
+                return completion
+            if self.tier is not None:
+                self.tier.loop_iteration(self.current_function, stmt)
 
     def _evaluate(self, expr):
         return expr.accept(self)
 
     def _execute(self, stmt):
-        stmt.accept(self)
+        return stmt.accept(self)
+
+    def resolve(self, expr, depth, slot):
+        self.locals[expr] = (depth, slot)
+
+    def resolve_access(self, expr, distance, slot, boxed):
+        self.accesses[expr] = (distance, slot, boxed)
+
+    def resolve_receiver(self, expr, distance, slot, boxed):
+        self.receivers[expr] = (distance, slot, boxed)
 
-    def resolve(self, expr, depth):
-        self.locals[expr] = depth
+    def resolve_tail_call(self, stmt):
+        self.tail_calls.add(stmt)
 
     def execute_block(self, statements, environment):
         previous = self.environment
@@ -249,7 +516,9 @@ class Interpreter(Expr, Stmt):
             self.environment = environment
 
             for statement in statements:
-                self._execute(statement)
+                completion = self._execute(statement)
+                if completion is not None:
+                    return completion
         finally:
             self.environment = previous
 
@@ -282,18 +551,6 @@ class Interpreter(Expr, Stmt):
 
         return str(obj)
 
-    def _check_number_operand(self, operator, operand):
-        if isinstance(operand, float):
-            return
-
-        raise RuntimeException(operator, "Operand must be a number.")
-
-    def _check_number_operands(self, operator, left, right):
-        if isinstance(left, float) and isinstance(right, float):
-            return
-
-        raise RuntimeException(operator, "Operands must be numbers.")
-
 class Clock(LoxCallable):
     @property
     def arity(self) -> int:
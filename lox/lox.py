@@ -1,17 +1,72 @@
 # lox.py
+import argparse
 import sys
+import warnings
 
 from .scanner import Scanner
 from .token import TokenType
 from .parser import Parser
-from .interpreter import Interpreter
+from .interpreter import Clock, Interpreter
 from .resolver import Resolver
+from .closurecompiler import ClosureInterpreter
+from .compiler import Compiler
+from .vm import VM
+from .transpiler import Transpiler
+from .exception import RuntimeException
+from . import pyruntime
+from .options import Options
+from .tiering import Tiering
+from .quickening import QuickeningInterpreter
+from .optimizer import Optimizer
+from .inliner import Inliner
+from .typeinference import TypeInference
+from .printer import AtsPrinter
+from .pgo import ProfileRecorder, apply_profile, program_key
+from .memoize import Memo, PurityAnalysis
+from .framepool import FramePool
+from .gcmonitor import GCMonitor
+from . import memoize
+from . import inlinecache
+from . import callcache
+
+ENGINES = ("interpreter", "closure", "vm")
+
+# Quickening threshold for profiled runs that don't set one with --quicken.
+PGO_QUICKEN_THRESHOLD = 8
 
 class Lox:
-    def __init__(self):
+    def __init__(self, options=None):
+        self.options = options or Options()
         self.had_error = False
         self.had_runtime_error = False
-        self.interpreter = Interpreter(self)
+        if self.options.engine == "closure":
+            self.interpreter = ClosureInterpreter(self)
+        elif self.options.quicken_threshold or self.options.pgo_record or self.options.pgo_use:
+            self.interpreter = QuickeningInterpreter(
+                self, self.options.quicken_threshold or PGO_QUICKEN_THRESHOLD)
+        else:
+            self.interpreter = Interpreter(self)
+        self.tier = None
+        if self.options.engine != "closure" and self.options.tier_threshold:
+            self.tier = Tiering(self.interpreter, self.options.tier_threshold)
+        self.recorder = None
+        if self.options.engine != "closure" and self.options.pgo_record:
+            # Sits in front of the tier so it sees every call and loop trip.
+            self.recorder = ProfileRecorder(self.interpreter, self.tier)
+            self.interpreter.tier = self.recorder
+        else:
+            self.interpreter.tier = self.tier
+        if self.options.frame_pool:
+            self.interpreter.frame_pool = FramePool(self.options.frame_pool)
+        # Every statement run so far, which the purity of a function
+        # declared on an earlier prompt line depends on as well.
+        self.program = []
+        self.gc = None
+        if self.options.gc_report or self.options.gc_freeze:
+            self.gc = GCMonitor()
+        self.vm = None
+        if self.options.engine == "vm":
+            self.vm = VM(self, {"clock": Clock()}, self.options.max_frames)
 
     def _report(self, line, where, message):
         print(f'[Line {line}] Error{where}: {message}')
@@ -41,6 +96,20 @@ class Lox:
             data = file.read()
             self.run(data)
 
+        if self.options.tier_report and self.tier is not None:
+            self.tier.report()
+        if self.options.quicken_report and isinstance(self.interpreter, QuickeningInterpreter):
+            self.interpreter.report()
+        if self.options.memo_report and self.options.memoize:
+            memoize.report(self.interpreter.memos)
+        if self.options.cache_report:
+            inlinecache.report(self.interpreter.property_caches)
+            callcache.report(self.interpreter.call_caches)
+        if self.options.frame_report and self.interpreter.frame_pool is not None:
+            self.interpreter.frame_pool.report()
+        if self.options.gc_report:
+            self.gc.report()
+
         if self.had_error:
             sys.exit(65)
         if self.had_runtime_error:
@@ -61,14 +130,169 @@ class Lox:
         if self.had_error:
             return
 
-        self.interpreter.interpret(statements)
+        transpile = self.options.emit_python or self.options.run_compiled
+
+        if self.options.optimize:
+            statements = Optimizer().optimize(statements)
+            # Only the interpreter's engines make use of the nodes these add.
+            if self.vm is None and not transpile:
+                statements = self._specialize(statements)
+        if self.options.dump_optimized:
+            print(AtsPrinter().print(statements), file=sys.stderr)
+
+        if self.options.memoize and self.vm is None and not transpile:
+            self._memoize(statements)
+
+        # Profiles describe the tree the quickening tree-walker runs.
+        profiled = isinstance(self.interpreter, QuickeningInterpreter) \
+            and self.vm is None and not transpile
+        if profiled and self.options.pgo_use:
+            apply_profile(self.options.pgo_use, program_key(line, self.options),
+                          statements, self.interpreter, self.tier)
+
+        if self.options.gc_freeze:
+            # The program lives until the end of the run, so collections
+            # needn't traverse it again and again.
+            self.gc.freeze()
+
+        if transpile:
+            self._run_transpiled(statements)
+        elif self.vm is not None:
+            function = Compiler(self).compile(statements)
+            self.vm.interpret(function)
+        else:
+            self.interpreter.interpret(statements)
+
+        if profiled and self.recorder is not None:
+            self.recorder.save(self.options.pgo_record, program_key(line, self.options),
+                               statements)
+
+    def _specialize(self, statements):
+        if self.options.inline_size > 0:
+            inliner = Inliner(self.interpreter, self.options.inline_size)
+            statements = inliner.inline(statements)
+            if self.options.inline_report:
+                inliner.report()
+
+        TypeInference(self.interpreter.locals).infer(statements)
+        return statements
+
+    def _memoize(self, statements):
+        self.program.extend(statements)
+        pure = PurityAnalysis(self.interpreter.locals).analyze(self.program)
+        memos = self.interpreter.memos
+        # A later prompt line may redefine or assign what a function declared
+        # earlier calls or reads, and that function keeps its memo.
+        for declaration in [declaration for declaration in memos if declaration not in pure]:
+            memos.pop(declaration).disable()
+        for declaration in sorted(pure - memos.keys(), key=lambda declaration: declaration.name.line):
+            memos[declaration] = Memo(declaration, self.options.memo_size)
+
+    def _run_transpiled(self, statements):
+        transpiler = Transpiler(self.interpreter.locals)
+        source = transpiler.transpile(statements)
+
+        if self.options.emit_python:
+            with open(self.options.emit_python, "w") as file:
+                file.write(source)
+            return
+
+        namespace = {"__name__": "__lox__"}
+        with warnings.catch_warnings():
+            # Calling a literal is a Lox runtime error, not a Python warning.
+            warnings.simplefilter("ignore", SyntaxWarning)
+            code = compile(source, "<plox>", "exec")
+        exec(code, namespace)
+        try:
+            pyruntime.run(namespace["_lox_main"], transpiler.line_map)
+        except RuntimeException as re:
+            self.runtime_error(re)
 
 def main():
-    l = Lox()
-    if len(sys.argv) > 2:
-        print("Usage: plox [script]")
-    elif len(sys.argv) == 2:
-        l.run_file(sys.argv[1])
+    parser = argparse.ArgumentParser(prog="plox")
+    parser.add_argument("script", nargs="?")
+    parser.add_argument("--engine", choices=ENGINES, default="interpreter",
+                        help="execution engine (default: interpreter)")
+    parser.add_argument("--emit-python", metavar="FILE",
+                        help="translate the script to Python source in FILE")
+    parser.add_argument("--run-compiled", action="store_true",
+                        help="translate the script to Python and run it in-process")
+    parser.add_argument("--tier-threshold", type=int, metavar="N",
+                        help="compile a function once it has run N calls or loop "
+                             "iterations (interpreter engine only)")
+    parser.add_argument("--tier-report", action="store_true",
+                        help="list promoted functions on stderr at exit")
+    parser.add_argument("--quicken", type=int, metavar="N", dest="quicken_threshold",
+                        help="specialize operators, property reads and calls after N "
+                             "runs with the same kind of operands (interpreter engine only)")
+    parser.add_argument("--quicken-report", action="store_true",
+                        help="print how many nodes were quickened and deoptimized on stderr")
+    parser.add_argument("--pgo-record", metavar="FILE",
+                        help="write the call counts, loop trips and operand types "
+                             "of this run to FILE (interpreter engine only)")
+    parser.add_argument("--pgo-use", metavar="FILE",
+                        help="pre-specialize the script from a profile written by "
+                             "--pgo-record; a stale profile is ignored")
+    parser.add_argument("--memoize", action="store_true",
+                        help="cache the results of pure functions (interpreter and "
+                             "closure engines)")
+    parser.add_argument("--memo-size", type=int, default=1024, metavar="N",
+                        help="results cached per pure function (default: 1024)")
+    parser.add_argument("--memo-report", action="store_true",
+                        help="print the cache hit rate of each pure function on stderr")
+    parser.add_argument("--cache-report", action="store_true",
+                        help="print inline cache hits and misses of property and "
+                             "call sites on stderr (interpreter and closure engines)")
+    parser.add_argument("--frame-pool", type=int, metavar="N",
+                        help="reuse up to N finished call and block scopes instead "
+                             "of allocating new ones (interpreter and closure engines)")
+    parser.add_argument("--frame-report", action="store_true",
+                        help="print how many scopes the frame pool reused on stderr")
+    parser.add_argument("--gc", action="store_true", dest="gc_report",
+                        help="print the garbage collections and their pause times "
+                             "on stderr")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="exempt the parsed program from garbage collection "
+                             "with gc.freeze() before running it")
+    parser.add_argument("--max-frames", type=int, default=100000, metavar="N",
+                        help="Lox call depth at which the vm engine reports a "
+                             "stack overflow (default: 100000)")
+    parser.add_argument("--optimize", action=argparse.BooleanOptionalAction, default=True,
+                        help="fold constants and remove dead code before running "
+                             "(default: on)")
+    parser.add_argument("--inline-size", type=int, default=16, metavar="N",
+                        help="inline top-level functions whose return expression has "
+                             "at most N nodes, 0 disables (interpreter and closure "
+                             "engines, default: 16)")
+    parser.add_argument("--inline-report", action="store_true",
+                        help="list inlined call sites on stderr")
+    parser.add_argument("--dump-optimized", action="store_true",
+                        help="print the program as it will run to stderr")
+    args = parser.parse_args()
+
+    l = Lox(Options(engine=args.engine, emit_python=args.emit_python,
+                    run_compiled=args.run_compiled,
+                    tier_threshold=args.tier_threshold,
+                    tier_report=args.tier_report,
+                    quicken_threshold=args.quicken_threshold,
+                    quicken_report=args.quicken_report,
+                    pgo_record=args.pgo_record,
+                    pgo_use=args.pgo_use,
+                    memoize=args.memoize,
+                    memo_size=args.memo_size,
+                    memo_report=args.memo_report,
+                    cache_report=args.cache_report,
+                    frame_pool=args.frame_pool,
+                    frame_report=args.frame_report,
+                    gc_report=args.gc_report,
+                    gc_freeze=args.gc_freeze,
+                    max_frames=args.max_frames,
+                    optimize=args.optimize,
+                    dump_optimized=args.dump_optimized,
+                    inline_size=args.inline_size,
+                    inline_report=args.inline_report))
+    if args.script:
+        l.run_file(args.script)
     else:
         l.run_prompt()
 
@@ -1,36 +1,54 @@
 from .loxcallable import LoxCallable
-from .loxinstance import LoxInstance
+from .loxinstance import LoxInstance, Shape
 
 class LoxClass(LoxCallable):
     def __init__(self, name : str, superclass, methods):
         self.name = name
+        self.superclass = None
+        self.methods = {}
+        # Every method the class responds to, inherited ones included, so
+        # a lookup is one dict access however deep the hierarchy is.
+        self.table = {}
+        self.initializer = None
+        self._arity = 0
+        # Instances start out empty; see Shape.
+        self.shape = Shape({})
+
+        if superclass != None:
+            self.inherit(superclass)
+        for method_name, method in methods.items():
+            self.add_method(method_name, method)
+
+    def inherit(self, superclass):
+        # Runs before the class's own methods are added, which override.
         self.superclass = superclass
-        self.methods = methods
+        self.table.update(superclass.table)
+        self._set_initializer(self.table.get("init"))
+
+    def add_method(self, name, method):
+        self.methods[name] = method
+        self.table[name] = method
+        if name == "init":
+            self._set_initializer(method)
+
+    def _set_initializer(self, initializer):
+        self.initializer = initializer
+        self._arity = 0 if initializer is None else initializer.arity
 
     def __call__(self, interpreter, arguments):
         instance = LoxInstance(self)
-        initializer = self.find_method("init")
+        initializer = self.initializer
         if initializer != None:
-            initializer.bind(instance).__call__(interpreter, arguments)
+            initializer.__call__(interpreter, arguments, instance)
 
         return instance
 
     def find_method(self, name):
-        if name in self.methods.keys():
-            return self.methods[name]
-
-        if self.superclass != None:
-            return self.superclass.find_method(name)
-
-        return None
+        return self.table.get(name)
 
     @property
     def arity(self) -> int:
-        initializer = self.find_method("init")
-        if initializer == None:
-            return 0;
-
-        return initializer.arity
+        return self._arity
 
     def __repr__(self) -> str:
         return f'{self.name}'
@@ -1,7 +1,7 @@
-from .environment import Environment
+from .environment import Cell, Environment
 from .loxcallable import LoxCallable
 from .stmt import Function
-from .returnvalue import ReturnValue
+from .returnvalue import RETURN, TAIL_CALL
 
 class Loxfunction(LoxCallable):
     def __init__(
@@ -13,8 +13,9 @@ class Loxfunction(LoxCallable):
         self._is_initializer = is_initializer
 
     def bind(self, instance):
-        environment = Environment(self.closure)
-        environment.define("this", instance)
+        if self.declaration.boxes_this:
+            instance = Cell(instance)
+        environment = Environment(self.closure, [instance])
         return Loxfunction(self.declaration, environment, self._is_initializer)
 
     @property
@@ -24,17 +25,59 @@ class Loxfunction(LoxCallable):
     def __repr__(self) -> str:
         return f"<fn {self.declaration.name.lexeme}>"
 
-    def __call__(self, interpreter, arguments):
-        environment = Environment(self.closure)
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
+    def __call__(self, interpreter, arguments, this=None):
+        # The parameters are the first slots of the body's scope, in order,
+        # so the argument list the caller built becomes the scope itself.
+        # Passing `this` runs a method as bind(this) would, without making
+        # the bound Loxfunction.
+        function = self
+        closure = self.closure
+        if this is not None:
+            closure = Environment(closure, [Cell(this) if self.declaration.boxes_this else this])
+        pool = interpreter.frame_pool
+        while True:
+            boxed = function.declaration.boxed_params
+            if boxed:
+                # Parameters a nested function captures live in Cells.
+                for index in boxed:
+                    arguments[index] = Cell(arguments[index])
+            if function.declaration.recursive:
+                arguments.append(function)
 
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnValue as ret:
-            if self._is_initializer:
-                return self.closure.get_at(0, "this")
-            return ret.value
+            if pool is None:
+                environment = Environment(closure, arguments)
+            elif pool.frames:
+                pool.reused += 1
+                environment = pool.frames.pop()
+                environment.enclosing = closure
+                environment.values = arguments
+            else:
+                pool.allocated += 1
+                environment = Environment(closure, arguments)
 
-        if self._is_initializer:
-            return self.closure.get_at(0, "this")
+            if interpreter.tier is None:
+                completion = interpreter.execute_block(function.declaration.body, environment)
+            else:
+                completion = interpreter.tier.execute(function.declaration, environment)
+
+            if pool is not None:
+                if len(pool.frames) < pool.size:
+                    # Don't keep the arguments or the closure alive.
+                    environment.enclosing = None
+                    environment.values = None
+                    pool.frames.append(environment)
+                else:
+                    pool.dropped += 1
+
+            # A call in tail position replaces this one instead of nesting
+            # inside it, so tail recursion runs in constant Python stack.
+            if completion is not TAIL_CALL:
+                break
+            function, arguments = interpreter.tail_call
+            closure = function.closure
+
+        if function._is_initializer:
+            this = closure.values[0]
+            return this.value if function.declaration.boxes_this else this
+        if completion is RETURN:
+            return interpreter.return_value
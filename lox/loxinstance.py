@@ -1,15 +1,42 @@
 from lox.exception import RuntimeException
 from lox.token import Token
 
+class Shape:
+    """The field layout shared by instances that got the same fields in the
+    same order.
+
+    `slots` maps each field name to its index in an instance's `values`.
+    Adding a field moves an instance to the shape reached by following the
+    transition for that name, which is created the first time and then
+    shared by every instance of the class that adds it next.
+    """
+
+    __slots__ = ("slots", "transitions")
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.transitions = {}
+
+    def add(self, name):
+        shape = self.transitions.get(name)
+        if shape is None:
+            shape = Shape({**self.slots, name: len(self.slots)})
+            self.transitions[name] = shape
+        return shape
+
 class LoxInstance:
+    __slots__ = ("klass", "shape", "values")
+
     def __init__(self, klass) -> None:
         self.klass = klass
-        self.fields = { }
+        self.shape = klass.shape
+        self.values = []
 
     def get(self, name : Token):
-        if name.lexeme in self.fields.keys():
-            return self.fields[name.lexeme]
-        
+        index = self.shape.slots.get(name.lexeme)
+        if index is not None:
+            return self.values[index]
+
         method = self.klass.find_method(name.lexeme)
         if method != None:
             return method.bind(self)
@@ -17,7 +44,12 @@ class LoxInstance:
         raise RuntimeException(name, f"Undefined property {name.lexeme}.")
 
     def set(self, name: Token, value):
-        self.fields[name.lexeme] = value
+        index = self.shape.slots.get(name.lexeme)
+        if index is None:
+            self.shape = self.shape.add(name.lexeme)
+            self.values.append(value)
+        else:
+            self.values[index] = value
 
     def __repr__(self) -> str:
-        return f"{self.klass.name} instance"
\ No newline at end of file
+        return f"{self.klass.name} instance"
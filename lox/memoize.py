@@ -0,0 +1,236 @@
+import math
+import sys
+from collections import OrderedDict
+
+from .expr import Expr, Variable
+from .loxfunction import Loxfunction
+from .stmt import Class, Function, Stmt, Var
+
+class PurityAnalysis(Expr, Stmt):
+    """Finds the top-level functions whose result depends only on their arguments.
+
+    A function is pure when its body doesn't print, set a field, assign
+    anything but its own locals, declare a function or class, or read a
+    global other than a top-level function that is declared once and never
+    assigned, and when every call in it is to such a function that is pure
+    too. Calls are solved as a fixed point starting from the assumption
+    that every function without a direct side effect is pure.
+    """
+
+    def __init__(self, locals):
+        self.locals = locals
+        self.current = None
+        self.depth = 0
+        self.impure = set()
+        self.callees = {}
+        self.assigned = set()
+
+    def analyze(self, statements):
+        functions = {}
+        names = {}
+        for statement in statements:
+            if isinstance(statement, (Function, Var, Class)):
+                name = statement.name.lexeme
+                names[name] = names.get(name, 0) + 1
+                if isinstance(statement, Function):
+                    functions[name] = statement
+        self.functions = {name: declaration for name, declaration in functions.items()
+                          if names[name] == 1}
+
+        for statement in statements:
+            statement.accept(self)
+
+        pure = {declaration for name, declaration in self.functions.items()
+                if declaration not in self.impure and name not in self.assigned}
+        changed = True
+        while changed:
+            changed = False
+            for declaration in list(pure):
+                if not self.callees[declaration] <= pure:
+                    pure.discard(declaration)
+                    changed = True
+        return pure
+
+    def _side_effect(self):
+        if self.current is not None:
+            self.impure.add(self.current)
+
+    def _global_function(self, expr):
+        if isinstance(expr, Variable) and expr not in self.locals:
+            return self.functions.get(expr.name.lexeme)
+        return None
+
+    def visit_block_stmt(self, stmt):
+        depth = self.depth
+        if stmt.scoped:
+            self.depth += 1
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.depth = depth
+
+    def visit_class_stmt(self, stmt):
+        self._side_effect()
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt):
+        if self.current is not None:
+            self._side_effect()
+            return
+
+        depth = self.depth
+        self.current = stmt
+        self.depth = 0
+        self.callees[stmt] = set()
+        for statement in stmt.body:
+            statement.accept(self)
+        self.current = None
+        self.depth = depth
+
+    def visit_if_stmt(self, stmt):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt):
+        stmt.expression.accept(self)
+        self._side_effect()
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+    def visit_while_stmt(self, stmt):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_assign_expr(self, expr):
+        expr.value.accept(self)
+        local = self.locals.get(expr)
+        if local is None:
+            self.assigned.add(expr.name.lexeme)
+        # The body's own scope and the blocks in it are the only ones a
+        # top-level function owns.
+        if local is None or local[0] > self.depth:
+            self._side_effect()
+
+    def visit_binary_expr(self, expr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr):
+        callee = self._global_function(expr.callee)
+        if callee is None:
+            expr.callee.accept(self)
+            self._side_effect()
+        elif self.current is not None:
+            self.callees[self.current].add(callee)
+
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_get_expr(self, expr):
+        expr.object_.accept(self)
+
+    def visit_grouping_expr(self, expr):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr):
+        pass
+
+    def visit_logical_expr(self, expr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_set_expr(self, expr):
+        expr.object_.accept(self)
+        expr.value.accept(self)
+        self._side_effect()
+
+    def visit_super_expr(self, expr):
+        self._side_effect()
+
+    def visit_this_expr(self, expr):
+        self._side_effect()
+
+    def visit_unary_expr(self, expr):
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr):
+        if expr not in self.locals and self._global_function(expr) is None:
+            self._side_effect()
+
+class Memo:
+    """A bounded least-recently-used cache of one function's results."""
+
+    def __init__(self, declaration, size):
+        self.declaration = declaration
+        self.size = size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+
+    def key(self, arguments):
+        if not self.enabled:
+            return None
+        key = []
+        for value in arguments:
+            kind = type(value)
+            if kind is float:
+                # 0 and -0 are equal but print differently.
+                key.append((kind, value, math.copysign(1.0, value)) if value == 0 else (kind, value))
+            elif kind is str or kind is bool or value is None:
+                key.append((kind, value))
+            else:
+                return None
+        return tuple(key)
+
+    def store(self, key, value):
+        self.results[key] = value
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def disable(self):
+        self.enabled = False
+        self.results.clear()
+
+class MemoizedFunction(Loxfunction):
+    """A pure Loxfunction that answers repeated calls from its Memo."""
+
+    def __init__(self, declaration, closure, memo):
+        super().__init__(declaration, closure, False)
+        self.memo = memo
+
+    def __call__(self, interpreter, arguments):
+        memo = self.memo
+        key = memo.key(arguments)
+        if key is None:
+            return super().__call__(interpreter, arguments)
+
+        results = memo.results
+        if key in results:
+            memo.hits += 1
+            results.move_to_end(key)
+            return results[key]
+
+        memo.misses += 1
+        # The body's scope is built on the argument list, so the key is
+        # taken before the call.
+        value = super().__call__(interpreter, arguments)
+        memo.store(key, value)
+        return value
+
+def report(memos, file=sys.stderr):
+    print(f"memoization: {len(memos)} pure function(s)", file=file)
+    for memo in memos.values():
+        calls = memo.hits + memo.misses
+        rate = f"{100 * memo.hits / calls:.1f}%" if calls else "-"
+        print(f"  <fn {memo.declaration.name.lexeme}> [line {memo.declaration.name.line}] "
+              f"{memo.hits} hits, {memo.misses} misses ({rate})", file=file)
@@ -0,0 +1,202 @@
+from .expr import Expr, Literal
+from .stmt import Block, Return, Stmt
+from .token import TokenType
+
+def _is_truthy(value):
+    return value is not None and value is not False
+
+def _numbers(left, right):
+    return isinstance(left, float) and isinstance(right, float)
+
+# Folds for operators whose result on literals is known at compile time.
+# They return NO_FOLD when the operation would be a runtime error, so the
+# error is still reported by the engine that runs the program.
+NO_FOLD = object()
+
+def _add(left, right):
+    if _numbers(left, right) or (isinstance(left, str) and isinstance(right, str)):
+        return left + right
+    return NO_FOLD
+
+def _divide(left, right):
+    if _numbers(left, right) and right != 0:
+        return left / right
+    return NO_FOLD
+
+def _arithmetic(operation):
+    def fold(left, right):
+        if _numbers(left, right):
+            return operation(left, right)
+        return NO_FOLD
+    return fold
+
+BINARY_FOLDS = {
+    TokenType.PLUS: _add,
+    TokenType.MINUS: _arithmetic(lambda left, right: left - right),
+    TokenType.STAR: _arithmetic(lambda left, right: left * right),
+    TokenType.SLASH: _divide,
+    TokenType.GREATER: _arithmetic(lambda left, right: left > right),
+    TokenType.GREATER_EQUAL: _arithmetic(lambda left, right: left >= right),
+    TokenType.LESS: _arithmetic(lambda left, right: left < right),
+    TokenType.LESS_EQUAL: _arithmetic(lambda left, right: left <= right),
+    TokenType.EQUAL_EQUAL: lambda left, right: left == right,
+    TokenType.BANG_EQUAL: lambda left, right: left != right,
+}
+
+class Optimizer(Expr, Stmt):
+    """Folds constant expressions and removes dead code from resolved statements.
+
+    Runs after the Resolver. Nodes are only replaced by literals, by one of
+    their own children or by nothing, so no variable reference moves to a
+    different scope and the distances and slots in `interpreter.locals`
+    stay valid for the rewritten tree.
+    """
+
+    def optimize(self, statements):
+        result = []
+        for statement in statements:
+            statement = statement.accept(self)
+            if statement is None:
+                continue
+
+            result.append(statement)
+            if isinstance(statement, Return):
+                # Everything after a return in the same block is unreachable.
+                break
+
+        return result
+
+    def _statement(self, stmt):
+        # A statement nested in if or while can't just disappear.
+        optimized = stmt.accept(self)
+        return Block([]) if optimized is None else optimized
+
+    def _expression(self, expr):
+        return expr.accept(self)
+
+    def visit_block_stmt(self, stmt):
+        stmt.statements = self.optimize(stmt.statements)
+        return stmt
+
+    def visit_class_stmt(self, stmt):
+        for method in stmt.methods:
+            method.accept(self)
+        return stmt
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression = self._expression(stmt.expression)
+        return stmt
+
+    def visit_function_stmt(self, stmt):
+        stmt.body = self.optimize(stmt.body)
+        return stmt
+
+    def visit_if_stmt(self, stmt):
+        condition = self._expression(stmt.condition)
+
+        if isinstance(condition, Literal):
+            if _is_truthy(condition.value):
+                return stmt.then_branch.accept(self)
+            if stmt.else_branch:
+                return stmt.else_branch.accept(self)
+            return None
+
+        stmt.condition = condition
+        stmt.then_branch = self._statement(stmt.then_branch)
+        if stmt.else_branch:
+            stmt.else_branch = self._statement(stmt.else_branch)
+        return stmt
+
+    def visit_print_stmt(self, stmt):
+        stmt.expression = self._expression(stmt.expression)
+        return stmt
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value:
+            stmt.value = self._expression(stmt.value)
+        return stmt
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer:
+            stmt.initializer = self._expression(stmt.initializer)
+        return stmt
+
+    def visit_while_stmt(self, stmt):
+        stmt.condition = self._expression(stmt.condition)
+
+        if isinstance(stmt.condition, Literal) and not _is_truthy(stmt.condition.value):
+            return None
+
+        stmt.body = self._statement(stmt.body)
+        return stmt
+
+    def visit_assign_expr(self, expr):
+        expr.value = self._expression(expr.value)
+        return expr
+
+    def visit_binary_expr(self, expr):
+        expr.left = self._expression(expr.left)
+        expr.right = self._expression(expr.right)
+
+        if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+            value = BINARY_FOLDS[expr.operator.token_type](expr.left.value, expr.right.value)
+            if value is not NO_FOLD:
+                return Literal(value)
+
+        return expr
+
+    def visit_call_expr(self, expr):
+        expr.callee = self._expression(expr.callee)
+        expr.arguments = [self._expression(argument) for argument in expr.arguments]
+        return expr
+
+    def visit_get_expr(self, expr):
+        expr.object_ = self._expression(expr.object_)
+        return expr
+
+    def visit_grouping_expr(self, expr):
+        expr.expression = self._expression(expr.expression)
+        if isinstance(expr.expression, Literal):
+            return expr.expression
+        return expr
+
+    def visit_literal_expr(self, expr):
+        return expr
+
+    def visit_logical_expr(self, expr):
+        expr.left = self._expression(expr.left)
+        expr.right = self._expression(expr.right)
+
+        if isinstance(expr.left, Literal):
+            truthy = _is_truthy(expr.left.value)
+            if expr.operator.token_type == TokenType.OR:
+                return expr.left if truthy else expr.right
+            return expr.right if truthy else expr.left
+
+        return expr
+
+    def visit_set_expr(self, expr):
+        expr.object_ = self._expression(expr.object_)
+        expr.value = self._expression(expr.value)
+        return expr
+
+    def visit_super_expr(self, expr):
+        return expr
+
+    def visit_this_expr(self, expr):
+        return expr
+
+    def visit_unary_expr(self, expr):
+        expr.right = self._expression(expr.right)
+
+        if isinstance(expr.right, Literal):
+            value = expr.right.value
+            if expr.operator.token_type == TokenType.BANG:
+                return Literal(not _is_truthy(value))
+            if isinstance(value, float):
+                return Literal(-value)
+
+        return expr
+
+    def visit_variable_expr(self, expr):
+        return expr
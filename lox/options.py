@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+
+@dataclass
+class Options:
+    engine: str = "interpreter"
+    emit_python: str = None
+    run_compiled: bool = False
+    tier_threshold: int = None
+    tier_report: bool = False
+    max_frames: int = 100000
+    optimize: bool = True
+    dump_optimized: bool = False
+    inline_size: int = 16
+    inline_report: bool = False
+    quicken_threshold: int = None
+    quicken_report: bool = False
+    pgo_record: str = None
+    pgo_use: str = None
+    memoize: bool = False
+    memo_size: int = 1024
+    memo_report: bool = False
+    cache_report: bool = False
+    frame_pool: int = None
+    frame_report: bool = False
+    gc_report: bool = False
+    gc_freeze: bool = False
@@ -1,5 +1,5 @@
 from .token import TokenType
-from .expr import Binary, Call, Get, Logical, Set, This, Unary, Literal, Grouping, Variable, Assign, Super
+from .expr import specialize, Binary, Call, Get, Invoke, Logical, Set, This, Unary, Literal, Grouping, Variable, Assign, Super
 from .stmt import Block, Class, Function, If, Print, Expression, Var, While, Return
 
 class ParseError(RuntimeError):
@@ -210,7 +210,7 @@ class Parser:
         while self._match(TokenType.OR):
             operator = self._previous()
             right = self._and()
-            expr = Logical(expr, operator, right)
+            expr = specialize(Logical(expr, operator, right))
 
         return expr
 
@@ -220,7 +220,7 @@ class Parser:
         while self._match(TokenType.AND):
             operator = self._previous()
             right = self._equality()
-            expr = Logical(expr, operator, right)
+            expr = specialize(Logical(expr, operator, right))
 
         return expr
 
@@ -229,7 +229,7 @@ class Parser:
         while self._match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
             operator = self._previous()
             right = self._comparison()
-            expr = Binary(expr, operator, right)
+            expr = specialize(Binary(expr, operator, right))
 
         return expr
 
@@ -239,7 +239,7 @@ class Parser:
         while self._match(TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL):
             operator = self._previous()
             right = self._term()
-            expr = Binary(expr, operator, right)
+            expr = specialize(Binary(expr, operator, right))
 
         return expr
 
@@ -249,7 +249,7 @@ class Parser:
         while self._match(TokenType.MINUS, TokenType.PLUS):
             operator = self._previous()
             right = self._factor()
-            expr = Binary(expr, operator, right)
+            expr = specialize(Binary(expr, operator, right))
 
         return expr
 
@@ -259,7 +259,7 @@ class Parser:
         while self._match(TokenType.SLASH, TokenType.STAR):
             operator = self._previous()
             right = self._unary()
-            expr = Binary(expr, operator, right)
+            expr = specialize(Binary(expr, operator, right))
 
         return expr
 
@@ -267,7 +267,7 @@ class Parser:
         if self._match(TokenType.BANG, TokenType.MINUS):
             operator = self._previous()
             right = self._unary()
-            return Unary(operator, right)
+            return specialize(Unary(operator, right))
 
         return self._call()
 
@@ -284,6 +284,8 @@ class Parser:
 
         paren = self._consume(TokenType.RIGHT_PAREN,
                                 "Expect ')' after arguments.")
+        if isinstance(callee, Get):
+            return Invoke(callee, paren, arguments)
         return Call(callee, paren, arguments)
 
     def _call(self):
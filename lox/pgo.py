@@ -0,0 +1,170 @@
+import hashlib
+import json
+import sys
+
+from .expr import GENERIC, QUICKENED, Expr
+from .stmt import Function, Stmt, While
+
+VERSION = 1
+
+def program_key(source, options):
+    """Hashes the source and the options that shape the tree that runs."""
+    text = f"plox-pgo {VERSION} {options.optimize} {options.inline_size}\n{source}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def number_nodes(statements):
+    """Lists the nodes of a program in a fixed pre-order.
+
+    A node's index is its position in profiles. It only depends on the tree,
+    so the same source parsed with the same options numbers alike. Each node
+    also gets the innermost function declaration it belongs to.
+    """
+    nodes = []
+    owners = []
+    seen = set()
+
+    def visit(node, owner):
+        if id(node) in seen:
+            return
+        seen.add(id(node))
+        nodes.append(node)
+        owners.append(owner)
+        if isinstance(node, Function):
+            owner = node
+
+        for value in vars(node).values():
+            for child in value if isinstance(value, list) else [value]:
+                # The only statement an expression holds is the declaration
+                # an Inline node refers to, which is numbered where it is.
+                if isinstance(child, Expr) or (isinstance(child, Stmt) and isinstance(node, Stmt)):
+                    visit(child, owner)
+
+    for statement in statements:
+        visit(statement, None)
+    return nodes, owners
+
+class ProfileRecorder:
+    """Counts function calls and loop trips for `--pgo-record`.
+
+    Installed as the interpreter's tier, so it sees every call of a Lox
+    function and every loop iteration; any real Tiering keeps working
+    behind it. Operand types come from the QuickeningInterpreter's
+    feedback.
+    """
+
+    def __init__(self, interpreter, tier=None):
+        self.interpreter = interpreter
+        self.tier = tier
+        self.calls = {}
+        self.trips = {}
+
+    def execute(self, declaration, environment):
+        self.calls[declaration] = self.calls.get(declaration, 0) + 1
+        if self.tier is not None:
+            return self.tier.execute(declaration, environment)
+        return self.interpreter.execute_block(declaration.body, environment)
+
+    def loop_iteration(self, declaration, loop):
+        self.trips[loop] = self.trips.get(loop, 0) + 1
+        if self.tier is not None:
+            self.tier.loop_iteration(declaration, loop)
+
+    def save(self, path, key, statements):
+        interpreter = self.interpreter
+        functions = {}
+        loops = {}
+        types = {}
+        for position, node in enumerate(number_nodes(statements)[0]):
+            if node in self.calls:
+                functions[position] = self.calls[node]
+            if node in self.trips:
+                loops[position] = self.trips[node]
+            if node in interpreter.feedback and node not in interpreter.unstable:
+                quickened = type(node) if type(node) in GENERIC else QUICKENED[type(node)]
+                types[position] = [quickened.__name__, interpreter.feedback[node]]
+
+        with open(path, "w") as file:
+            json.dump({"version": VERSION, "program": key, "functions": functions,
+                       "loops": loops, "types": types}, file)
+
+class ProfileError(Exception):
+    pass
+
+def _load(path, key):
+    try:
+        with open(path) as file:
+            profile = json.load(file)
+    except (OSError, ValueError) as error:
+        raise ProfileError(f"can't read it ({error})")
+
+    if not isinstance(profile, dict) or profile.get("version") != VERSION:
+        raise ProfileError("not a profile for this version of plox")
+    if profile.get("program") != key:
+        raise ProfileError("recorded for a different program or options")
+    return profile
+
+def _entries(profile, name, nodes):
+    entries = profile.get(name)
+    if not isinstance(entries, dict):
+        raise ProfileError(f"no {name} section")
+
+    for position, value in entries.items():
+        try:
+            position = int(position)
+            if position < 0:
+                raise IndexError(position)
+            node = nodes[position]
+        except (ValueError, IndexError):
+            raise ProfileError(f"unknown node position {position!r}")
+        yield position, node, value
+
+def _is_count(value):
+    # JSON's true and false load as bools, which are ints too.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def apply_profile(path, key, statements, interpreter, tier=None):
+    """Pre-specializes a program from a profile written by `--pgo-record`.
+
+    Nodes that stayed monomorphic for at least the quickening threshold
+    start out quickened, and with tiering, functions whose calls and loop
+    trips reach the tier threshold are compiled up front. Everything is
+    validated before the tree is touched: a profile that can't be read, is
+    for another program or doesn't match the tree is ignored with a note on
+    stderr. Returns whether the profile was used.
+    """
+    nodes, owners = number_nodes(statements)
+    try:
+        profile = _load(path, key)
+        quicken = []
+        for _, node, value in _entries(profile, "types", nodes):
+            quickened = QUICKENED.get(type(node))
+            if quickened is None or not isinstance(value, list) or len(value) != 2 \
+                    or value[0] != quickened.__name__ or not _is_count(value[1]):
+                raise ProfileError("operand types don't match the program")
+            if value[1] >= interpreter.threshold:
+                quicken.append((node, quickened))
+
+        counts = {}
+        for _, node, value in _entries(profile, "functions", nodes):
+            if not isinstance(node, Function) or not _is_count(value):
+                raise ProfileError("function counts don't match the program")
+            counts[node] = counts.get(node, 0) + value
+        for position, node, value in _entries(profile, "loops", nodes):
+            if not isinstance(node, While) or not _is_count(value):
+                raise ProfileError("loop counts don't match the program")
+            owner = owners[position]
+            if owner is not None:
+                counts[owner] = counts.get(owner, 0) + value
+    except ProfileError as error:
+        print(f"pgo: ignoring profile {path}: {error}", file=sys.stderr)
+        return False
+
+    for node, quickened in quicken:
+        node.__class__ = quickened
+        interpreter.quickened += 1
+
+    if tier is not None:
+        for declaration, count in counts.items():
+            if count >= tier.threshold:
+                tier.preload(declaration, count)
+    return True
@@ -1,20 +1,24 @@
-from .expr import ExprVisitor
+from .expr import Expr
+from .stmt import Stmt
 
-class AtsPrinter(ExprVisitor):
-    def print(self, expr):
-        return expr.accept(self)
+class AtsPrinter(Expr, Stmt):
+    def print(self, node):
+        if isinstance(node, list):
+            return "\n".join(statement.accept(self) for statement in node)
+
+        return node.accept(self)
 
     def visit_binary_expr(self, expr):
         return self.parenthesize(expr.operator.lexeme, expr.left, expr.right)
 
     def visit_assign_expr(self, expr):
-        pass
+        return self.parenthesize(f"= {expr.name.lexeme}", expr.value)
 
     def visit_call_expr(self, expr):
-        pass
+        return self.parenthesize("call", expr.callee, *expr.arguments)
 
     def visit_get_expr(self, expr):
-        pass
+        return self.parenthesize(f". {expr.name.lexeme}", expr.object_)
 
     def visit_grouping_expr(self, expr):
         return self.parenthesize('group', expr.expression)
@@ -22,26 +26,74 @@ class AtsPrinter(ExprVisitor):
     def visit_literal_expr(self, expr):
         if expr.value == None:
             return 'nil'
+        if isinstance(expr.value, bool):
+            return str(expr.value).lower()
+        if isinstance(expr.value, str):
+            return f'"{expr.value}"'
+        if isinstance(expr.value, float):
+            text = str(expr.value)
+            return text[:-2] if text.endswith(".0") else text
 
         return expr.value
 
     def visit_logical_expr(self, expr):
-        pass
+        return self.parenthesize(expr.operator.lexeme, expr.left, expr.right)
 
     def visit_set_expr(self, expr):
-        pass
+        return self.parenthesize(f"= . {expr.name.lexeme}", expr.object_, expr.value)
 
     def visit_super_expr(self, expr):
-        pass
+        return f"(super {expr.method.lexeme})"
 
     def visit_this_expr(self, expr):
-        pass
+        return "this"
 
     def visit_unary_expr(self, expr):
         return self.parenthesize(expr.operator.lexeme, expr.right)
 
     def visit_variable_expr(self, expr):
-        pass
+        return expr.name.lexeme
+
+    def visit_block_stmt(self, stmt):
+        return self.parenthesize("block", *stmt.statements)
+
+    def visit_class_stmt(self, stmt):
+        name = f"class {stmt.name.lexeme}"
+        if stmt.superclass != None:
+            name += f" < {stmt.superclass.name.lexeme}"
+
+        return self.parenthesize(name, *stmt.methods)
+
+    def visit_expression_stmt(self, stmt):
+        return self.parenthesize(";", stmt.expression)
+
+    def visit_function_stmt(self, stmt):
+        params = " ".join(param.lexeme for param in stmt.params)
+        return self.parenthesize(f"fun {stmt.name.lexeme} ({params})", *stmt.body)
+
+    def visit_if_stmt(self, stmt):
+        if stmt.else_branch:
+            return self.parenthesize("if-else", stmt.condition, stmt.then_branch, stmt.else_branch)
+
+        return self.parenthesize("if", stmt.condition, stmt.then_branch)
+
+    def visit_print_stmt(self, stmt):
+        return self.parenthesize("print", stmt.expression)
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value:
+            return self.parenthesize("return", stmt.value)
+
+        return "(return)"
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer:
+            return self.parenthesize(f"var {stmt.name.lexeme} =", stmt.initializer)
+
+        return f"(var {stmt.name.lexeme})"
+
+    def visit_while_stmt(self, stmt):
+        return self.parenthesize("while", stmt.condition, stmt.body)
 
     def parenthesize(self, name: str, *exprs):
         result = f"({name}"
@@ -0,0 +1,217 @@
+"""Runtime support for Python code generated by the Transpiler.
+
+Generated modules import this as `_rt`. The helpers keep Lox semantics
+(number/string checks, truthiness, printing) where plain Python operators
+would behave differently.
+"""
+import re
+import sys
+import time
+import types
+
+from .exception import RuntimeException
+from .token import Token, TokenType
+
+class LoxError(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(message)
+
+class ArityError(LoxError):
+    """A call with the wrong number of arguments."""
+
+class Cell:
+    """Box for a captured variable that is reassigned or declared in a loop."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+        return value
+
+class LoxClassType(type):
+    # Properties only live on instances; `Foo.bar` is an error in Lox.
+    def __getattribute__(cls, name):
+        if name.startswith("p_"):
+            raise AttributeError(name, name=name, obj=cls)
+        return super().__getattribute__(name)
+
+class LoxObject(metaclass=LoxClassType):
+    def __init__(self, *arguments):
+        if arguments:
+            arity(0, (), arguments)
+
+def clock(*extra):
+    if extra:
+        arity(0, (), extra)
+    return time.time()
+
+# Default for every generated parameter, so missing arguments can be told
+# apart from nil and reported with Lox's arity message.
+MISSING = object()
+
+def arity(expected, arguments, extra):
+    given = sum(1 for argument in arguments if argument is not MISSING)
+    raise ArityError(f"Expected {expected} arguments but got {given + len(extra)}.")
+
+def inherit(superclass):
+    if not isinstance(superclass, LoxClassType):
+        raise LoxError("Superclass must be a class.")
+    return superclass
+
+def truthy(value):
+    return value is not None and value is not False
+
+def falsy(value):
+    return value is None or value is False
+
+def add(a, b):
+    if type(a) is float and type(b) is float:
+        return a + b
+    if type(a) is str and type(b) is str:
+        return a + b
+    raise LoxError("Operands must be two numbers or two strings.")
+
+def _numbers(a, b):
+    if type(a) is not float or type(b) is not float:
+        raise LoxError("Operands must be numbers.")
+
+def sub(a, b):
+    _numbers(a, b)
+    return a - b
+
+def mul(a, b):
+    _numbers(a, b)
+    return a * b
+
+def div(a, b):
+    _numbers(a, b)
+    return a / b
+
+def lt(a, b):
+    _numbers(a, b)
+    return a < b
+
+def le(a, b):
+    _numbers(a, b)
+    return a <= b
+
+def gt(a, b):
+    _numbers(a, b)
+    return a > b
+
+def ge(a, b):
+    _numbers(a, b)
+    return a >= b
+
+def neg(a):
+    if type(a) is not float:
+        raise LoxError("Operand must be a number.")
+    return -a
+
+def set_property(obj, name, value):
+    if not isinstance(obj, LoxObject):
+        raise LoxError("Only instances have fields.")
+    setattr(obj, name, value)
+    return value
+
+def undefined(name, value=None):
+    raise LoxError(f"Undefined variable '{name}'.")
+
+def lox_name(name):
+    # Generated names are a lowercase prefix, an optional counter and the
+    # original Lox name, e.g. `g_fib`, `l3_count` or `p_init`.
+    return re.sub(r"^[a-z]+\d*_", "", name)
+
+def stringify(obj):
+    if obj is None:
+        return "nil"
+
+    if isinstance(obj, float):
+        text = str(obj)
+        if text.endswith(".0"):
+            text = text[0:len(text) - 2]
+        return text
+
+    if isinstance(obj, LoxObject):
+        return f"{lox_name(type(obj).__name__)} instance"
+    if isinstance(obj, LoxClassType):
+        return lox_name(obj.__name__)
+    if isinstance(obj, types.MethodType):
+        obj = obj.__func__
+    if obj is clock:
+        return "<native fun>"
+    if isinstance(obj, types.FunctionType):
+        return f"<fn {lox_name(obj.__name__)}>"
+
+    return str(obj)
+
+def _message(error):
+    if isinstance(error, LoxError):
+        return error.message
+    if isinstance(error, NameError):
+        return f"Undefined variable '{lox_name(error.name)}'."
+    if isinstance(error, AttributeError):
+        if isinstance(error.obj, (LoxObject, super)):
+            return f"Undefined property {lox_name(error.name)}."
+        return "Only instances have properties."
+    if isinstance(error, RecursionError):
+        return "Stack overflow."
+    if isinstance(error, TypeError) and "not callable" in str(error):
+        return "Can only call functions and classes."
+    return None
+
+def translate(error, filename, lines):
+    """Map an exception raised by generated code to a Lox RuntimeException.
+
+    The Lox line is taken from the innermost traceback entry that belongs
+    to the generated module, or for an arity error from the call that made
+    it. Returns None for errors Lox does not define.
+    """
+    message = _message(error)
+    if message is None:
+        return None
+
+    entries = []
+    traceback = error.__traceback__
+    while traceback is not None:
+        if traceback.tb_frame.f_code.co_filename == filename:
+            entries.append(traceback)
+        traceback = traceback.tb_next
+
+    # A generated function checks its own arity, so the innermost entry is
+    # the callee, reached from a call through the `__init__` that calls a
+    # class's initializer. The runtime's own callables are not generated,
+    # so the innermost entry is the call.
+    if isinstance(error, ArityError) and len(entries) > 1 \
+            and entries[-1].tb_next.tb_frame.f_code is arity.__code__:
+        entries.pop()
+        if len(entries) > 1 and entries[-1].tb_frame.f_code.co_name == "__init__":
+            entries.pop()
+
+    line = 0
+    for entry in entries:
+        line = lines.get(entry.tb_lineno, line)
+
+    return RuntimeException(Token(TokenType.EOF, "", None, line), message)
+
+def run(main, lines):
+    """Run a generated module's entry point, reraising Lox errors as
+    RuntimeException."""
+    filename = main.__code__.co_filename
+    try:
+        main()
+    except (LoxError, NameError, AttributeError, TypeError, RecursionError) as error:
+        lox_error = translate(error, filename, lines)
+        if lox_error is None:
+            raise
+        raise lox_error from None
+
+def main(entry, lines):
+    try:
+        run(entry, lines)
+    except RuntimeException as error:
+        print(f"{error.message}\n [line {error.token.line}]")
+        sys.exit(70)
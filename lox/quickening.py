@@ -0,0 +1,202 @@
+import operator
+import sys
+
+from .exception import RuntimeException
+from .expr import (GENERIC, QUICKENED, Add, Divide, Greater, GreaterEqual, Less,
+                   LessEqual, Multiply, Subtract)
+from .interpreter import Interpreter
+from .loxfunction import Loxfunction
+from .loxinstance import LoxInstance
+
+FLOAT_OPERATIONS = {
+    Add: operator.add,
+    Subtract: operator.sub,
+    Multiply: operator.mul,
+    Divide: operator.truediv,
+    Greater: operator.gt,
+    GreaterEqual: operator.ge,
+    Less: operator.lt,
+    LessEqual: operator.le,
+}
+
+class QuickeningInterpreter(Interpreter):
+    """Tree-walker that rewrites nodes from the types it observes.
+
+    Arithmetic and comparison nodes count how often both operands were
+    floats, Get nodes how often they read an instance field and Call nodes
+    how often they called a Lox function with the right number of
+    arguments. After `threshold` such runs the node switches in place to
+    its quickened variant, which does only that behind one cheap guard. A
+    node that sees anything else before then stays generic. When the guard
+    fails the node is deoptimized back to its generic class for good, and
+    the generic logic finishes the operation on the values already
+    evaluated, so no operand is evaluated twice.
+    """
+
+    def __init__(self, lox, threshold):
+        super().__init__(lox)
+        self.threshold = threshold
+        self.feedback = {}
+        self.unstable = set()
+        self.quickened = 0
+        self.deoptimized = 0
+
+    def _observe(self, expr):
+        if expr in self.unstable:
+            return
+
+        count = self.feedback.get(expr, 0) + 1
+        self.feedback[expr] = count
+        # A recursive call made while evaluating the operands may already
+        # have switched the node.
+        quickened = QUICKENED.get(type(expr))
+        if count >= self.threshold and quickened is not None:
+            expr.__class__ = quickened
+            self.quickened += 1
+
+    def _deoptimize(self, expr):
+        generic = GENERIC.get(type(expr))
+        if generic is not None:
+            expr.__class__ = generic
+            self.unstable.add(expr)
+            self.deoptimized += 1
+
+    def _binary(self, expr, left, right):
+        if isinstance(left, float) and isinstance(right, float):
+            return FLOAT_OPERATIONS[GENERIC.get(type(expr), type(expr))](left, right)
+        if isinstance(expr, Add):
+            if isinstance(left, str) and isinstance(right, str):
+                return left + right
+            raise RuntimeException(expr.operator,
+                                   "Operands must be two numbers or two strings.")
+        raise RuntimeException(expr.operator, "Operands must be numbers.")
+
+    def _profile_binary(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        result = self._binary(expr, left, right)
+        if type(left) is float and type(right) is float:
+            self._observe(expr)
+        else:
+            self.unstable.add(expr)
+        return result
+
+    visit_add_expr = _profile_binary
+    visit_subtract_expr = _profile_binary
+    visit_multiply_expr = _profile_binary
+    visit_divide_expr = _profile_binary
+    visit_greater_expr = _profile_binary
+    visit_greater_equal_expr = _profile_binary
+    visit_less_expr = _profile_binary
+    visit_less_equal_expr = _profile_binary
+
+    def _deoptimize_binary(self, expr, left, right):
+        self._deoptimize(expr)
+        return self._binary(expr, left, right)
+
+    def visit_float_add_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left + right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_subtract_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left - right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_multiply_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left * right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_divide_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left / right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_greater_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left > right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_greater_equal_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left >= right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_less_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left < right
+        return self._deoptimize_binary(expr, left, right)
+
+    def visit_float_less_equal_expr(self, expr):
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            return left <= right
+        return self._deoptimize_binary(expr, left, right)
+
+    def _get(self, expr, obj):
+        if isinstance(obj, LoxInstance):
+            return (expr.cache or self._property_cache(expr)).get(obj)
+
+        raise RuntimeException(expr.name,
+            "Only instances have properties.")
+
+    def visit_get_expr(self, expr):
+        obj = self._evaluate(expr.object_)
+        value = self._get(expr, obj)
+        if type(obj) is LoxInstance and expr.name.lexeme in obj.shape.slots:
+            self._observe(expr)
+        else:
+            self.unstable.add(expr)
+        return value
+
+    def visit_field_get_expr(self, expr):
+        obj = self._evaluate(expr.object_)
+        if type(obj) is LoxInstance:
+            index = obj.shape.slots.get(expr.name.lexeme)
+            if index is not None:
+                return obj.values[index]
+
+        self._deoptimize(expr)
+        return self._get(expr, obj)
+
+    def visit_call_expr(self, expr):
+        callee = self._evaluate(expr.callee)
+        if type(callee) is Loxfunction and len(callee.declaration.params) == len(expr.arguments):
+            self._observe(expr)
+        else:
+            self.unstable.add(expr)
+        return self._finish_call(expr, callee)
+
+    def visit_function_call_expr(self, expr):
+        callee = self._evaluate(expr.callee)
+        if type(callee) is not Loxfunction or len(callee.declaration.params) != len(expr.arguments):
+            self._deoptimize(expr)
+            return self._finish_call(expr, callee)
+
+        # The guard already checked what _finish_call would.
+        arguments = [self._evaluate(argument) for argument in expr.arguments]
+        try:
+            return callee.__call__(self, arguments)
+        except RecursionError:
+            raise RuntimeException(expr.paren, "Stack overflow.") from None
+
+    def report(self, file=sys.stderr):
+        print(f"quickening: {self.quickened} node(s) quickened, "
+              f"{self.deoptimized} deoptimized (threshold {self.threshold})", file=file)
@@ -1,6 +1,6 @@
 from enum import Enum
-from .expr import Expr
-from .stmt import Stmt
+from .expr import Assign, Call, Expr, Variable
+from .stmt import Class, Function, Stmt, Var, walk
 from .token import Token
 
 class FunctionType(Enum):
@@ -14,11 +14,40 @@ class ClassType(Enum):
     CLASS = 1,
     SUBCLASS = 2,
 
+class FunctionScopes:
+    """The scopes of one function being resolved, from `base` up.
+
+    A method's scopes start at the `this` scope its class opened.
+    """
+
+    def __init__(self, declaration, base):
+        self.declaration = declaration
+        self.base = base
+        self.upvalues = {}
+
 class Resolver(Expr, Stmt):
+    """Resolves every local reference, for the analyses and for the engines.
+
+    `interpreter.resolve` gets the lexical (distance, slot), counting every
+    scope out to the declaring one. `interpreter.resolve_access` gets what
+    the tree-walker and the closure compiler run: a function's scope chain
+    stops at its own scopes, followed by one scope holding the Cells of
+    the variables it captures from enclosing functions, listed in its
+    `upvalues`. A local that some nested function captures is boxed, so its
+    scope and every closure share one Cell. A function that captures
+    nothing has no closure at all.
+    """
+
     def __init__(self, interpreter, lox):
         self.interpreter = interpreter
         self.lox = lox
         self.scopes = []
+        self.slots = []
+        self.declarations = []
+        self.captured = []
+        self.pending = []
+        self.bodies = []
+        self.functions = []
         self.current_function = FunctionType.NONE
         self._current_class = ClassType.NONE
 
@@ -27,7 +56,13 @@ class Resolver(Expr, Stmt):
         return len(self.scopes) == 0
 
     def visit_block_stmt(self, stmt):
-        self._begin_scope()
+        stmt.scoped = any(isinstance(statement, (Var, Function, Class))
+                          for statement in stmt.statements)
+        if not stmt.scoped:
+            self.resolve(stmt.statements)
+            return
+
+        self._begin_scope(stmt.statements)
         self.resolve(stmt.statements)
         self._end_scope()
 
@@ -43,29 +78,85 @@ class Resolver(Expr, Stmt):
     def _resolve_local(self, expr, name):
         for i in range(len(self.scopes) -1, -1, -1):
             if name.lexeme in self.scopes[i].keys():
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+                self.interpreter.resolve(expr, len(self.scopes) - 1 - i,
+                                         self.slots[i][name.lexeme])
+                self._resolve_access(expr, i, name.lexeme,
+                                     self.interpreter.resolve_access)
                 return
 
+    def _resolve_access(self, expr, scope, name, resolve):
+        top = len(self.scopes) - 1
+        function = self.functions[-1] if self.functions else None
+
+        if function is None or scope >= function.base:
+            # Whether the variable is boxed is only known once its scope
+            # has been resolved to the end.
+            self.pending[scope].append(
+                (resolve, expr, top - scope, self.slots[scope][name], name))
+        elif function.declaration.recursive and scope == function.base - 1 \
+                and name == function.declaration.name.lexeme:
+            resolve(expr, top - function.base, len(function.declaration.params), False)
+        else:
+            upvalue = self._capture(len(self.functions) - 1, scope, name)
+            resolve(expr, top - function.base + 1, upvalue, True)
+
+    def _capture(self, index, scope, name):
+        """Returns the upvalue of `functions[index]` that holds the variable.
+
+        Seen from where the function is declared, the variable is either a
+        local of the enclosing function, which gets boxed, or one of the
+        enclosing function's own upvalues, captured in turn.
+        """
+        function = self.functions[index]
+        upvalue = function.upvalues.get((scope, name))
+        if upvalue is not None:
+            return upvalue
+
+        enclosing = self.functions[index - 1] if index > 0 else None
+        if enclosing is None or scope >= enclosing.base:
+            self.captured[scope].add(name)
+            location = (function.base - 1 - scope, self.slots[scope][name])
+        else:
+            location = (function.base - enclosing.base,
+                        self._capture(index - 1, scope, name))
+
+        upvalues = function.declaration.upvalues
+        upvalue = function.upvalues[(scope, name)] = len(upvalues)
+        upvalues.append(location)
+        return upvalue
+
     def _resolve_function(self, function, function_type):
         enclosing_function = self.current_function
         self.current_function = function_type
 
-        self._begin_scope()
+        # A method's scopes include the `this` scope of its class.
+        base = len(self.scopes)
+        if function_type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            base -= 1
+        function.upvalues = []
+        function.boxed_params = ()
+        self.functions.append(FunctionScopes(function, base))
+
+        self._begin_scope(function.body)
 
-        for param in function.params:
-            self._declare(param)
+        for index, param in enumerate(function.params):
+            self._declare(param, (function, index))
             self._define(param)
+        if function.recursive:
+            # "fun" can't be a variable name, so this only takes the slot.
+            self.slots[-1]["fun"] = len(function.params)
 
         self.resolve(function.body)
         self._end_scope()
 
+        self.functions.pop()
         self.current_function = enclosing_function
 
     def visit_class_stmt(self, stmt):
         enclosing_class = self._current_class
         self._current_class = ClassType.CLASS
 
-        self._declare(stmt.name)
+        self._declare(stmt.name, stmt)
         self._define(stmt.name)
 
         if stmt.superclass != None and stmt.name.lexeme == stmt.superclass.name.lexeme:
@@ -79,9 +170,12 @@ class Resolver(Expr, Stmt):
         if stmt.superclass != None:
             self._begin_scope()
             self.scopes[-1]["super"] = True
+            self.slots[-1]["super"] = 0
 
         self._begin_scope()
         self.scopes[-1]["this"] = True
+        self.slots[-1]["this"] = 0
+        self.declarations[-1]["this"] = stmt
 
         for method in stmt.methods:
             declaration = FunctionType.METHOD
@@ -96,13 +190,39 @@ class Resolver(Expr, Stmt):
 
         self._current_class = enclosing_class
 
-    def _begin_scope(self):
+    def _begin_scope(self, statements=None):
         self.scopes.append({})
+        self.slots.append({})
+        self.declarations.append({})
+        self.captured.append(set())
+        self.pending.append([])
+        self.bodies.append(statements)
 
     def _end_scope(self):
-        self.scopes.pop()
+        captured = self.captured.pop()
+        declarations = self.declarations.pop()
+        for name in captured:
+            self._box(name, declarations.get(name))
+
+        for resolve, expr, distance, slot, name in self.pending.pop():
+            resolve(expr, distance, slot, name in captured)
 
-    def _declare(self, name: Token):
+        self.scopes.pop()
+        self.slots.pop()
+        self.bodies.pop()
+
+    def _box(self, name, declaration):
+        # `super` has no declaration, the interpreter always boxes it.
+        if name == "this":
+            for method in declaration.methods:
+                method.boxes_this = True
+        elif isinstance(declaration, tuple):
+            function, index = declaration
+            function.boxed_params += (index,)
+        elif declaration is not None:
+            declaration.boxed = True
+
+    def _declare(self, name: Token, declaration=None):
         if self.scopes_is_empty:
             return
 
@@ -112,6 +232,9 @@ class Resolver(Expr, Stmt):
                 name, "Already a variable with this name in this scope.")
 
         scope[name.lexeme] = False
+        self.declarations[-1][name.lexeme] = declaration
+        slots = self.slots[-1]
+        slots[name.lexeme] = len(slots)
 
     def _define(self, name: Token):
         if self.scopes_is_empty:
@@ -120,17 +243,27 @@ class Resolver(Expr, Stmt):
         self.scopes[-1][name.lexeme] = True
 
     def visit_var_stmt(self, stmt):
-        self._declare(stmt.name)
+        self._declare(stmt.name, stmt)
         if stmt.initializer != None:
             self.resolve(stmt.initializer)
 
         self._define(stmt.name)
 
     def visit_function_stmt(self, stmt):
-        self._declare(stmt.name)
+        self._declare(stmt.name, stmt)
         self._define(stmt.name)
+        stmt.recursive = not self.scopes_is_empty and self._refers_to_itself(stmt)
         self._resolve_function(stmt, FunctionType.FUNCTION)
 
+    def _refers_to_itself(self, function):
+        # Only the statements of the declaring scope can assign the name.
+        name = function.name.lexeme
+        if not any(isinstance(node, Variable) and node.name.lexeme == name
+                   for statement in function.body for node in walk(statement)):
+            return False
+        return not any(isinstance(node, Assign) and node.name.lexeme == name
+                       for statement in self.bodies[-1] for node in walk(statement))
+
     def visit_expression_stmt(self, stmt):
         self.resolve(stmt.expression)
 
@@ -154,6 +287,9 @@ class Resolver(Expr, Stmt):
                                "Can't return a value from an initializer")
             self.resolve(stmt.value)
 
+            if isinstance(stmt.value, Call):
+                self.interpreter.resolve_tail_call(stmt)
+
     def visit_while_stmt(self, stmt):
         self.resolve(stmt.condition)
         self.resolve(stmt.body)
@@ -207,6 +343,12 @@ class Resolver(Expr, Stmt):
                            "Can't use 'super' in a class with no superclass.")
 
         self._resolve_local(expr, expr.keyword)
+        # The method's `this` is the object the super method gets bound to.
+        for i in range(len(self.scopes) - 1, -1, -1):
+            if "this" in self.scopes[i]:
+                self._resolve_access(expr, i, "this",
+                                     self.interpreter.resolve_receiver)
+                return
 
     def visit_this_expr(self, expr):
         if self._current_class == ClassType.NONE:
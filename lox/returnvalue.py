@@ -1,3 +1,7 @@
-class ReturnValue(RuntimeError):
-    def __init__(self, value):
-        self.value = value
+# Statements complete with None, with RETURN once a `return` has run, or
+# with TAIL_CALL for a `return f(...)` the Resolver found in tail position.
+# The returned value is left in `interpreter.return_value` and the pending
+# call in `interpreter.tail_call`, so returning from nested blocks and loops
+# unwinds without raising, and Loxfunction runs tail calls in a loop.
+RETURN = object()
+TAIL_CALL = object()
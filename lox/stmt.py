@@ -1,3 +1,5 @@
+from .expr import Expr
+
 class Stmt():
     def accept(self, visitor):
         return getattr(self, f'visit_{type(visitor).__name__.lower()}_stmt')(visitor)
@@ -5,6 +7,9 @@ class Stmt():
 class Block(Stmt):
     def __init__(self, statements):
         self.statements = statements
+        # The Resolver clears this for a block that declares nothing; such a
+        # block runs in the enclosing scope and resolved distances skip it.
+        self.scoped = True
 
     def accept(self, visitor):
         return visitor.visit_block_stmt(self)
@@ -14,6 +19,9 @@ class Class(Stmt):
         self.name = name
         self.superclass = superclass
         self.methods = methods
+        # Set by the Resolver when a method or nested function captures the
+        # class name, which then lives in a Cell.
+        self.boxed = False
 
     def accept(self, visitor):
         return visitor.visit_class_stmt(self)
@@ -37,6 +45,18 @@ class Function(Stmt):
         self.name = name
         self.params = params
         self.body = body
+        # Filled in by the Resolver. `upvalues` lists the (distance, slot)
+        # of each Cell the function captures, seen from where it is
+        # declared. The other fields say which of its own declarations
+        # live in Cells because a nested function captures them.
+        self.upvalues = []
+        self.boxed = False
+        self.boxed_params = ()
+        self.boxes_this = False
+        # A local function that calls itself by a name that is never
+        # reassigned reads itself from the slot after its parameters
+        # instead of capturing its own Cell, which would be a cycle.
+        self.recursive = False
 
     def accept(self, visitor):
         return visitor.visit_function_stmt(self)
@@ -62,6 +82,8 @@ class Var(Stmt):
     def __init__(self, name, initializer):
         self.name = name
         self.initializer = initializer
+        # Set by the Resolver when a nested function captures the variable.
+        self.boxed = False
 
     def accept(self, visitor):
         return visitor.visit_var_stmt(self)
@@ -73,3 +95,15 @@ class While(Stmt):
 
     def accept(self, visitor):
         return visitor.visit_while_stmt(self)
+
+def walk(node):
+    """Yields a statement or expression and every node under it, in pre-order.
+
+    The only statement an expression holds is the declaration an Inline
+    node refers to, which is not part of the expression.
+    """
+    yield node
+    for value in vars(node).values():
+        for child in value if isinstance(value, list) else (value,):
+            if isinstance(child, Expr) or (isinstance(child, Stmt) and isinstance(node, Stmt)):
+                yield from walk(child)
@@ -0,0 +1,67 @@
+import sys
+
+from .closurecompiler import ClosureCompiler
+
+class Tiering:
+    """Promotes hot function bodies from the tree-walker to closure code.
+
+    Every call of a declaration, and every loop iteration run inside it,
+    counts towards its threshold. Once reached, the body is compiled with
+    the ClosureCompiler and every later call of any Loxfunction created
+    from the declaration, including bound methods and closures made before
+    the promotion, runs the compiled body in the same environment.
+    """
+
+    def __init__(self, interpreter, threshold):
+        self.interpreter = interpreter
+        self.threshold = threshold
+        self.compiler = ClosureCompiler(interpreter)
+        self.counts = {}
+        self.compiled = {}
+        self.promoted = []
+
+    def execute(self, declaration, environment):
+        interpreter = self.interpreter
+        body = self.compiled.get(declaration)
+
+        if body is None:
+            count = self.counts.get(declaration, 0) + 1
+            self.counts[declaration] = count
+            if count < self.threshold:
+                previous = interpreter.current_function
+                interpreter.current_function = declaration
+                try:
+                    return interpreter.execute_block(declaration.body, environment)
+                finally:
+                    interpreter.current_function = previous
+
+            body = self._promote(declaration)
+
+        previous = interpreter.environment
+        try:
+            interpreter.environment = environment
+            return body()
+        finally:
+            interpreter.environment = previous
+
+    def loop_iteration(self, declaration, loop):
+        if declaration is not None and declaration not in self.compiled:
+            self.counts[declaration] = self.counts.get(declaration, 0) + 1
+
+    def preload(self, declaration, count):
+        if declaration not in self.compiled:
+            self.counts[declaration] = count
+            self._promote(declaration)
+
+    def _promote(self, declaration):
+        body = self.compiler.compile_block(declaration.body)
+        self.compiled[declaration] = body
+        self.promoted.append((declaration, self.counts[declaration]))
+        return body
+
+    def report(self, file=sys.stderr):
+        print(f"tiering: {len(self.promoted)} function(s) promoted "
+              f"(threshold {self.threshold})", file=file)
+        for declaration, count in self.promoted:
+            print(f"  <fn {declaration.name.lexeme}> [line {declaration.name.line}] "
+                  f"after {count} calls/iterations", file=file)
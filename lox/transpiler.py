@@ -0,0 +1,597 @@
+from .expr import Assign, Binary, Expr, Grouping, Literal, Logical, Set, This, Unary, Variable
+from .stmt import Stmt
+from .token import TokenType
+
+class Decl:
+    """A resolved local variable and the Python names it is emitted as."""
+
+    def __init__(self, local, cell, function, in_loop):
+        self.local = local
+        self.cell = cell
+        self.function = function
+        self.in_loop = in_loop
+        self.captured = False
+        self.assigned = False
+        self.is_this = False
+
+    @property
+    def is_cell(self):
+        # Python closures bind variables, not values, and a loop body reuses
+        # its frame. Captured variables that change, or that get a fresh
+        # binding per iteration, are boxed in an explicit cell instead.
+        return self.captured and (self.assigned or self.in_loop) and not self.is_this
+
+    @property
+    def python(self):
+        return self.cell if self.is_cell else self.local
+
+class CaptureAnalysis(Expr, Stmt):
+    """Mirrors the Resolver's scopes to map every resolved local to a Decl.
+
+    Uses the distances the Resolver stored in `locals` to find the
+    declaration, and records which declarations are captured by nested
+    functions and which are assigned after their declaration.
+    """
+
+    def __init__(self, locals):
+        self.locals = locals
+        self.scopes = []
+        self.function = None
+        self.functions = [None]
+        self.loop_depth = 0
+        self.declarations = {}
+        self.parameters = {}
+        self.references = {}
+        self.free = {}
+        self.globals = set()
+        self.assigned_globals = {None: set()}
+        self._counter = 0
+
+    def analyze(self, statements):
+        for statement in statements:
+            statement.accept(self)
+
+    def _declare(self, node, name):
+        if not self.scopes:
+            self.globals.add(name)
+            self.assigned_globals[None].add(name)
+            return None
+
+        self._counter += 1
+        decl = Decl(f"l{self._counter}_{name}", f"c{self._counter}_{name}",
+                    self.function, self.loop_depth > 0)
+        self.scopes[-1][name] = decl
+        if node is not None:
+            self.declarations[node] = decl
+        return decl
+
+    def _reference(self, expr, name):
+        local = self.locals.get(expr)
+        if local is None:
+            return None
+
+        distance = local[0]
+        decl = self.scopes[-1 - distance][name]
+        if decl.function is not self.function:
+            decl.captured = True
+            for function in reversed(self.functions):
+                if function is decl.function:
+                    break
+                self.free[function].add(decl)
+        self.references[expr] = decl
+        return decl
+
+    def _function(self, stmt):
+        enclosing = (self.function, self.loop_depth)
+        self.function = stmt
+        self.functions.append(stmt)
+        self.loop_depth = 0
+        self.assigned_globals[stmt] = set()
+        self.free[stmt] = set()
+
+        self.scopes.append({})
+        self.parameters[stmt] = [self._declare(None, param.lexeme) for param in stmt.params]
+        for statement in stmt.body:
+            statement.accept(self)
+        self.scopes.pop()
+
+        self.functions.pop()
+        self.function, self.loop_depth = enclosing
+
+    def visit_block_stmt(self, stmt):
+        if stmt.scoped:
+            self.scopes.append({})
+        for statement in stmt.statements:
+            statement.accept(self)
+        if stmt.scoped:
+            self.scopes.pop()
+
+    def visit_class_stmt(self, stmt):
+        self._declare(stmt, stmt.name.lexeme)
+        if stmt.superclass is not None:
+            stmt.superclass.accept(self)
+            self.scopes.append({"super": Decl("super", "super", self.function, False)})
+            self.scopes[-1]["super"].is_this = True
+
+        this = Decl("this", "this", self.function, False)
+        this.is_this = True
+        self.scopes.append({"this": this})
+        for method in stmt.methods:
+            self._function(method)
+        self.scopes.pop()
+
+        if stmt.superclass is not None:
+            self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt):
+        self._declare(stmt, stmt.name.lexeme)
+        self._function(stmt)
+
+    def visit_if_stmt(self, stmt):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt):
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        self._declare(stmt, stmt.name.lexeme)
+
+    def visit_while_stmt(self, stmt):
+        self.loop_depth += 1
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+        self.loop_depth -= 1
+
+    def visit_assign_expr(self, expr):
+        expr.value.accept(self)
+        decl = self._reference(expr, expr.name.lexeme)
+        if decl is not None:
+            decl.assigned = True
+        else:
+            self.assigned_globals[self.function].add(expr.name.lexeme)
+
+    def visit_binary_expr(self, expr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_get_expr(self, expr):
+        expr.object_.accept(self)
+
+    def visit_grouping_expr(self, expr):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr):
+        pass
+
+    def visit_logical_expr(self, expr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_set_expr(self, expr):
+        expr.value.accept(self)
+        expr.object_.accept(self)
+
+    def visit_super_expr(self, expr):
+        self._reference(expr, "super")
+
+    def visit_this_expr(self, expr):
+        self._reference(expr, "this")
+
+    def visit_unary_expr(self, expr):
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr):
+        self._reference(expr, expr.name.lexeme)
+
+class FunctionCode:
+    """Lines of the Python function currently being emitted."""
+
+    def __init__(self, enclosing, kind):
+        self.enclosing = enclosing
+        self.kind = kind
+        self.temps = 0
+
+_ARITHMETIC = {
+    TokenType.MINUS: ("-", "sub"),
+    TokenType.STAR: ("*", "mul"),
+    TokenType.SLASH: ("/", "div"),
+    TokenType.LESS: ("<", "lt"),
+    TokenType.LESS_EQUAL: ("<=", "le"),
+    TokenType.GREATER: (">", "gt"),
+    TokenType.GREATER_EQUAL: (">=", "ge"),
+}
+
+_BOOLEAN_OPERATORS = (
+    TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL, TokenType.LESS,
+    TokenType.LESS_EQUAL, TokenType.GREATER, TokenType.GREATER_EQUAL,
+)
+
+class Transpiler(Expr, Stmt):
+    """Translates resolved Lox statements into Python source.
+
+    Lox functions become Python functions and classes become Python classes
+    deriving from pyruntime.LoxObject. Resolved locals become Python locals,
+    or explicit cells when CaptureAnalysis says a closure needs one. Lox
+    globals become module globals. Alongside the source a map from Python
+    line to Lox line is produced, so runtime errors report Lox lines.
+    """
+
+    def __init__(self, locals):
+        self.locals = locals
+        self.analysis = None
+        self.lines = []
+        self.line_map = {}
+        self.code = None
+        self._indent = 0
+        self._line = 0
+
+    def transpile(self, statements):
+        self.analysis = CaptureAnalysis(self.locals)
+        self.analysis.analyze(statements)
+
+        self.lines = [
+            "from lox import pyruntime as _rt",
+            "",
+            "_M = _rt.MISSING",
+            "g_clock = _rt.clock",
+            "",
+        ]
+        self._begin_function("def _lox_main():", "script", None)
+        for statement in statements:
+            self._statement(statement)
+        self._end_function()
+
+        self.lines += [
+            "",
+            f"LINES = {self.line_map!r}",
+            "",
+            'if __name__ == "__main__":',
+            "    _rt.main(_lox_main, LINES)",
+        ]
+        return "\n".join(self.lines) + "\n"
+
+    def _emit(self, text):
+        self.lines.append("    " * self._indent + text)
+        self.line_map[len(self.lines)] = self._line
+
+    def _statement(self, stmt):
+        stmt.accept(self)
+
+    def _block(self, statements):
+        start = len(self.lines)
+        for statement in statements:
+            self._statement(statement)
+        if len(self.lines) == start:
+            self._emit("pass")
+
+    def _indented(self, statements):
+        self._indent += 1
+        self._block(statements)
+        self._indent -= 1
+
+    def _begin_function(self, header, kind, function):
+        self._emit(header)
+        self._indent += 1
+        self.code = FunctionCode(self.code, kind)
+        self.code.start = len(self.lines)
+
+        assigned = self.analysis.assigned_globals[function]
+        if assigned:
+            names = ", ".join(self._global_name(name) for name in sorted(assigned))
+            self._emit(f"global {names}")
+
+    def _end_function(self):
+        if len(self.lines) == self.code.start:
+            self._emit("pass")
+
+        self._indent -= 1
+        self.code = self.code.enclosing
+
+    def _temp(self):
+        self.code.temps += 1
+        return f"_t{self.code.temps}"
+
+    def _track(self, token):
+        if token is not None:
+            self._line = token.line
+
+    def _global_name(self, name):
+        return f"g_{name}"
+
+    def _read(self, expr, name):
+        decl = self.analysis.references.get(expr)
+        if decl is None:
+            return self._global_name(name)
+        if decl.is_cell:
+            return f"{decl.python}.value"
+        return decl.python
+
+    def _define(self, node, name, value):
+        """Bind a declaration to a value, as a statement."""
+        decl = self.analysis.declarations.get(node)
+        if decl is None:
+            self._emit(f"{self._global_name(name)} = {value}")
+        elif decl.is_cell:
+            self._emit(f"{decl.python} = _rt.Cell({value})")
+        else:
+            self._emit(f"{decl.python} = {value}")
+
+    def _declare_callable(self, node, name):
+        """Return the Python name to def a function or class under.
+
+        A function or class that lives in a cell gets its cell before the
+        definition, so its own body can capture it.
+        """
+        decl = self.analysis.declarations.get(node)
+        if decl is None:
+            return self._global_name(name)
+        if decl.is_cell:
+            self._emit(f"{decl.cell} = _rt.Cell(None)")
+        return decl.local
+
+    def _define_callable(self, node):
+        decl = self.analysis.declarations.get(node)
+        if decl is not None and decl.is_cell:
+            self._emit(f"{decl.cell}.value = {decl.local}")
+
+    def _function(self, stmt, python_name, kind):
+        params = self.analysis.parameters[stmt]
+        signature = ["this"] if kind != "function" else []
+
+        if params:
+            signature += [f"{decl.local}=_M" for decl in params]
+            arguments = ", ".join(decl.local for decl in params)
+            check = (f"if {params[-1].local} is _M or _x: "
+                     f"_rt.arity({len(params)}, ({arguments},), _x)")
+        else:
+            check = "if _x: _rt.arity(0, (), _x)"
+        signature.append("*_x")
+
+        # Cells from enclosing functions are bound when the function is
+        # created, so a closure made in a loop keeps that iteration's cell.
+        for decl in sorted(self.analysis.free[stmt], key=lambda decl: decl.cell):
+            if decl.is_cell:
+                signature.append(f"{decl.cell}={decl.cell}")
+
+        self._track(stmt.name)
+        self._begin_function(f"def {python_name}({', '.join(signature)}):", kind, stmt)
+        self._emit(check)
+        for decl in params:
+            if decl.is_cell:
+                self._emit(f"{decl.cell} = _rt.Cell({decl.local})")
+
+        self._block(stmt.body)
+        if kind == "initializer":
+            self._emit("return this")
+        self._end_function()
+
+    def _condition(self, expr):
+        if self._is_boolean(expr):
+            return self._expression(expr)
+        return f"_rt.truthy({self._expression(expr)})"
+
+    def _is_boolean(self, expr):
+        if isinstance(expr, Grouping):
+            return self._is_boolean(expr.expression)
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, bool)
+        if isinstance(expr, Binary):
+            return expr.operator.token_type in _BOOLEAN_OPERATORS
+        if isinstance(expr, Unary):
+            return expr.operator.token_type == TokenType.BANG
+        if isinstance(expr, Logical):
+            return self._is_boolean(expr.left) and self._is_boolean(expr.right)
+        return False
+
+    def _is_simple(self, expr):
+        # Expressions that are cheap and side-effect free to evaluate twice.
+        if isinstance(expr, Grouping):
+            return self._is_simple(expr.expression)
+        return isinstance(expr, (Variable, This)) or (
+            isinstance(expr, Literal) and isinstance(expr.value, float))
+
+    def _expression(self, expr):
+        return expr.accept(self)
+
+    def visit_expression_stmt(self, stmt):
+        expr = stmt.expression
+        self._track_expression(expr)
+        if isinstance(expr, Assign):
+            decl = self.analysis.references.get(expr)
+            if decl is not None:
+                value = self._expression(expr.value)
+                if decl.is_cell:
+                    self._emit(f"{decl.python}.value = {value}")
+                else:
+                    self._emit(f"{decl.python} = {value}")
+                return
+        if isinstance(expr, Set) and isinstance(expr.object_, This):
+            value = self._expression(expr.value)
+            self._emit(f"this.p_{expr.name.lexeme} = {value}")
+            return
+
+        self._emit(self._expression(expr))
+
+    def _track_expression(self, expr):
+        for attribute in ("operator", "name", "paren", "keyword"):
+            token = getattr(expr, attribute, None)
+            if token is not None:
+                self._track(token)
+                return
+        for attribute in ("left", "callee", "object_", "expression", "value", "right"):
+            child = getattr(expr, attribute, None)
+            if isinstance(child, Expr):
+                self._track_expression(child)
+                return
+
+    def visit_print_stmt(self, stmt):
+        self._track_expression(stmt.expression)
+        self._emit(f"print(_rt.stringify({self._expression(stmt.expression)}))")
+
+    def visit_var_stmt(self, stmt):
+        self._track(stmt.name)
+        value = "None"
+        if stmt.initializer is not None:
+            value = self._expression(stmt.initializer)
+        self._define(stmt, stmt.name.lexeme, value)
+
+    def visit_block_stmt(self, stmt):
+        # Every declaration already has a unique Python name, so blocks need
+        # no scope of their own.
+        self._block(stmt.statements)
+
+    def visit_if_stmt(self, stmt):
+        self._track_expression(stmt.condition)
+        self._emit(f"if {self._condition(stmt.condition)}:")
+        self._indented([stmt.then_branch])
+        if stmt.else_branch:
+            self._emit("else:")
+            self._indented([stmt.else_branch])
+
+    def visit_while_stmt(self, stmt):
+        self._track_expression(stmt.condition)
+        self._emit(f"while {self._condition(stmt.condition)}:")
+        self._indented([stmt.body])
+
+    def visit_function_stmt(self, stmt):
+        name = self._declare_callable(stmt, stmt.name.lexeme)
+        self._function(stmt, name, "function")
+        self._define_callable(stmt)
+
+    def visit_return_stmt(self, stmt):
+        self._track(stmt.keyword)
+        if self.code.kind == "initializer":
+            self._emit("return this")
+        elif stmt.value is None:
+            self._emit("return None")
+        else:
+            self._emit(f"return {self._expression(stmt.value)}")
+
+    def visit_class_stmt(self, stmt):
+        self._track(stmt.name)
+        base = "_rt.LoxObject"
+        if stmt.superclass is not None:
+            base = f"_rt.inherit({self._expression(stmt.superclass)})"
+        name = self._declare_callable(stmt, stmt.name.lexeme)
+
+        self._emit(f"class {name}({base}):")
+        self._indent += 1
+        if not stmt.methods:
+            self._emit("pass")
+        for method in stmt.methods:
+            kind = "method"
+            if method.name.lexeme == "init":
+                kind = "initializer"
+                self._emit("def __init__(this, *arguments):")
+                self._emit("    this.p_init(*arguments)")
+            self._function(method, f"p_{method.name.lexeme}", kind)
+        self._indent -= 1
+        self._define_callable(stmt)
+
+    def visit_literal_expr(self, expr):
+        return repr(expr.value)
+
+    def visit_grouping_expr(self, expr):
+        return self._expression(expr.expression)
+
+    def visit_unary_expr(self, expr):
+        right = self._expression(expr.right)
+        if expr.operator.token_type == TokenType.BANG:
+            if self._is_boolean(expr.right):
+                return f"(not {right})"
+            return f"_rt.falsy({right})"
+        if self._is_simple(expr.right):
+            return f"(-{right} if type({right}) is float else _rt.neg({right}))"
+        return f"_rt.neg({right})"
+
+    def visit_binary_expr(self, expr):
+        left = self._expression(expr.left)
+        right = self._expression(expr.right)
+        token_type = expr.operator.token_type
+
+        if token_type == TokenType.EQUAL_EQUAL:
+            return f"({left} == {right})"
+        if token_type == TokenType.BANG_EQUAL:
+            return f"(not {left} == {right})"
+        if token_type == TokenType.PLUS:
+            operator, helper = "+", "add"
+        else:
+            operator, helper = _ARITHMETIC[token_type]
+
+        if not (self._is_simple(expr.left) and self._is_simple(expr.right)):
+            return f"_rt.{helper}({left}, {right})"
+
+        # Both operands are cheap to re-read, so check for floats inline and
+        # only call the helper to handle strings or report the error.
+        guards = [f"type({operand}) is float"
+                  for operand, node in ((left, expr.left), (right, expr.right))
+                  if not isinstance(node, Literal)]
+        if not guards:
+            return f"({left} {operator} {right})"
+        return f"({left} {operator} {right} if {' and '.join(guards)} else _rt.{helper}({left}, {right}))"
+
+    def visit_logical_expr(self, expr):
+        left = self._expression(expr.left)
+        right = self._expression(expr.right)
+        keyword = "or" if expr.operator.token_type == TokenType.OR else "and"
+
+        if self._is_boolean(expr.left):
+            return f"({left} {keyword} {right})"
+
+        temp = self._temp()
+        if keyword == "or":
+            return f"({temp} if _rt.truthy({temp} := {left}) else {right})"
+        return f"({right} if _rt.truthy({temp} := {left}) else {temp})"
+
+    def visit_variable_expr(self, expr):
+        return self._read(expr, expr.name.lexeme)
+
+    def visit_this_expr(self, expr):
+        return "this"
+
+    def visit_super_expr(self, expr):
+        return f"super(__class__, this).p_{expr.method.lexeme}"
+
+    def visit_assign_expr(self, expr):
+        value = self._expression(expr.value)
+        decl = self.analysis.references.get(expr)
+        if decl is not None:
+            if decl.is_cell:
+                return f"{decl.python}.set({value})"
+            return f"({decl.python} := {value})"
+
+        name = expr.name.lexeme
+        if name not in self.analysis.globals and name != "clock":
+            return f"_rt.undefined({name!r}, {value})"
+
+        return f"({self._global_name(name)} := {value})"
+
+    def visit_call_expr(self, expr):
+        callee = self._expression(expr.callee)
+        arguments = ", ".join(self._expression(argument) for argument in expr.arguments)
+        return f"{callee}({arguments})"
+
+    def visit_get_expr(self, expr):
+        return f"{self._expression(expr.object_)}.p_{expr.name.lexeme}"
+
+    def visit_set_expr(self, expr):
+        obj = self._expression(expr.object_)
+        value = self._expression(expr.value)
+        return f"_rt.set_property({obj}, 'p_{expr.name.lexeme}', {value})"
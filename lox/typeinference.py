@@ -0,0 +1,196 @@
+from .expr import (NUMBER_OPERATIONS, Add, Assign, Divide, Expr, Grouping,
+                   Literal, Multiply, Negate, Subtract, Unary, Variable)
+from .stmt import Stmt
+
+# A declaration whose value can't be described by its definitions, such as
+# a parameter, function, class, `this` or a `var` without initializer.
+UNKNOWN = None
+
+class TypeInference(Expr, Stmt):
+    """Proves which arithmetic and comparison operands are always numbers.
+
+    Flow-insensitive: a local holds a number if its initializer and every
+    expression ever assigned to it are numbers, which is solved as a fixed
+    point starting from the assumption that every local does. Globals,
+    parameters and anything else that can be set from outside are unknown.
+
+    Operator nodes whose operands are all proven numbers are switched in
+    place to their Number variant, which the interpreter runs without
+    operand checks. Every other node keeps its checks, so errors are
+    reported exactly as before.
+    """
+
+    def __init__(self, locals):
+        self.locals = locals
+        self.scopes = []
+        self.definitions = {}
+        self.references = {}
+        self.operations = []
+        self.numbers = set()
+
+    def infer(self, statements):
+        for statement in statements:
+            statement.accept(self)
+
+        self.numbers = {decl for decl, definitions in self.definitions.items()
+                        if UNKNOWN not in definitions}
+        changed = True
+        while changed:
+            changed = False
+            for decl in list(self.numbers):
+                if not all(self._is_number(expr) for expr in self.definitions[decl]):
+                    self.numbers.discard(decl)
+                    changed = True
+
+        proven = 0
+        for expr in self.operations:
+            number_operation = NUMBER_OPERATIONS.get(type(expr))
+            if number_operation is not None and self._operands_are_numbers(expr):
+                expr.__class__ = number_operation
+                proven += 1
+        return proven
+
+    def _is_number(self, expr):
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, float)
+        if isinstance(expr, Grouping):
+            return self._is_number(expr.expression)
+        if isinstance(expr, Variable):
+            return self.references.get(expr) in self.numbers
+        if isinstance(expr, Assign):
+            return self._is_number(expr.value)
+        if isinstance(expr, (Subtract, Multiply, Divide, Negate)):
+            # These either produce a number or raise.
+            return True
+        if isinstance(expr, Add):
+            return self._is_number(expr.left) and self._is_number(expr.right)
+        return False
+
+    def _operands_are_numbers(self, expr):
+        if isinstance(expr, Unary):
+            return self._is_number(expr.right)
+        return self._is_number(expr.left) and self._is_number(expr.right)
+
+    def _declare(self, name, definition):
+        if not self.scopes:
+            return
+
+        decl = object()
+        self.scopes[-1][name] = decl
+        self.definitions[decl] = [definition]
+
+    def _reference(self, expr, name):
+        local = self.locals.get(expr)
+        if local is None:
+            return None
+
+        decl = self.scopes[-1 - local[0]][name]
+        self.references[expr] = decl
+        return decl
+
+    def _function(self, stmt):
+        self.scopes.append({})
+        for param in stmt.params:
+            self._declare(param.lexeme, UNKNOWN)
+        for statement in stmt.body:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def visit_block_stmt(self, stmt):
+        if stmt.scoped:
+            self.scopes.append({})
+        for statement in stmt.statements:
+            statement.accept(self)
+        if stmt.scoped:
+            self.scopes.pop()
+
+    def visit_class_stmt(self, stmt):
+        self._declare(stmt.name.lexeme, UNKNOWN)
+        if stmt.superclass is not None:
+            stmt.superclass.accept(self)
+            self.scopes.append({})
+            self._declare("super", UNKNOWN)
+
+        self.scopes.append({})
+        self._declare("this", UNKNOWN)
+        for method in stmt.methods:
+            self._function(method)
+        self.scopes.pop()
+
+        if stmt.superclass is not None:
+            self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt):
+        self._declare(stmt.name.lexeme, UNKNOWN)
+        self._function(stmt)
+
+    def visit_if_stmt(self, stmt):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt):
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        self._declare(stmt.name.lexeme, stmt.initializer)
+
+    def visit_while_stmt(self, stmt):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_assign_expr(self, expr):
+        expr.value.accept(self)
+        decl = self._reference(expr, expr.name.lexeme)
+        if decl is not None:
+            self.definitions[decl].append(expr.value)
+
+    def visit_binary_expr(self, expr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+        self.operations.append(expr)
+
+    def visit_call_expr(self, expr):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_get_expr(self, expr):
+        expr.object_.accept(self)
+
+    def visit_grouping_expr(self, expr):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr):
+        pass
+
+    def visit_logical_expr(self, expr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_set_expr(self, expr):
+        expr.value.accept(self)
+        expr.object_.accept(self)
+
+    def visit_super_expr(self, expr):
+        self._reference(expr, "super")
+
+    def visit_this_expr(self, expr):
+        self._reference(expr, "this")
+
+    def visit_unary_expr(self, expr):
+        expr.right.accept(self)
+        self.operations.append(expr)
+
+    def visit_variable_expr(self, expr):
+        self._reference(expr, expr.name.lexeme)
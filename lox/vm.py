@@ -0,0 +1,473 @@
+from .chunk import Chunk, OpCode
+from .exception import RuntimeException
+from .loxcallable import LoxCallable
+from .loxclass import LoxClass
+from .loxinstance import LoxInstance
+
+class VMFunction:
+    def __init__(self, name, arity=0):
+        self.name = name
+        self.arity = arity
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+
+    def __repr__(self) -> str:
+        return f"<fn {self.name}>"
+
+class Upvalue:
+    __slots__ = ("index", "value", "is_open")
+
+    def __init__(self, index):
+        self.index = index
+        self.value = None
+        self.is_open = True
+
+class VMClosure:
+    def __init__(self, function, upvalues):
+        self.function = function
+        self.upvalues = upvalues
+
+    @property
+    def arity(self) -> int:
+        return self.function.arity
+
+    def bind(self, instance):
+        return VMBoundMethod(instance, self)
+
+    def __repr__(self) -> str:
+        return f"<fn {self.function.name}>"
+
+class VMBoundMethod:
+    def __init__(self, receiver, method):
+        self.receiver = receiver
+        self.method = method
+
+    @property
+    def arity(self) -> int:
+        return self.method.arity
+
+    def __repr__(self) -> str:
+        return repr(self.method)
+
+class CallFrame:
+    __slots__ = ("closure", "ip", "base")
+
+    def __init__(self, closure, base):
+        self.closure = closure
+        self.ip = 0
+        self.base = base
+
+# Opcodes as plain ints, so the dispatch loop compares ints rather than
+# enum members.
+CONSTANT = OpCode.CONSTANT.value
+NIL = OpCode.NIL.value
+TRUE = OpCode.TRUE.value
+FALSE = OpCode.FALSE.value
+POP = OpCode.POP.value
+GET_LOCAL = OpCode.GET_LOCAL.value
+SET_LOCAL = OpCode.SET_LOCAL.value
+GET_GLOBAL = OpCode.GET_GLOBAL.value
+DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+SET_GLOBAL = OpCode.SET_GLOBAL.value
+GET_UPVALUE = OpCode.GET_UPVALUE.value
+SET_UPVALUE = OpCode.SET_UPVALUE.value
+GET_PROPERTY = OpCode.GET_PROPERTY.value
+SET_PROPERTY = OpCode.SET_PROPERTY.value
+GET_SUPER = OpCode.GET_SUPER.value
+EQUAL = OpCode.EQUAL.value
+NOT_EQUAL = OpCode.NOT_EQUAL.value
+GREATER = OpCode.GREATER.value
+GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+LESS = OpCode.LESS.value
+LESS_EQUAL = OpCode.LESS_EQUAL.value
+ADD = OpCode.ADD.value
+SUBTRACT = OpCode.SUBTRACT.value
+MULTIPLY = OpCode.MULTIPLY.value
+DIVIDE = OpCode.DIVIDE.value
+NOT = OpCode.NOT.value
+NEGATE = OpCode.NEGATE.value
+PRINT = OpCode.PRINT.value
+JUMP = OpCode.JUMP.value
+JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+LOOP = OpCode.LOOP.value
+CALL = OpCode.CALL.value
+GET_METHOD = OpCode.GET_METHOD.value
+CALL_METHOD = OpCode.CALL_METHOD.value
+CLOSURE = OpCode.CLOSURE.value
+CLOSE_UPVALUE = OpCode.CLOSE_UPVALUE.value
+RETURN = OpCode.RETURN.value
+CLASS = OpCode.CLASS.value
+INHERIT = OpCode.INHERIT.value
+METHOD = OpCode.METHOD.value
+
+# Marks the receiver slot of a GET_METHOD that found a field instead of a
+# method, so CALL_METHOD falls back to an ordinary call.
+_NO_RECEIVER = object()
+
+class VM:
+    """Stack-based virtual machine executing chunks made by the Compiler.
+
+    Lox calls push CallFrames onto a list instead of recursing in Python,
+    so call depth is bounded only by max_frames.
+    """
+
+    def __init__(self, lox, globals, max_frames=100000):
+        self.lox = lox
+        self.globals = globals
+        self.max_frames = max_frames
+        self.stack = []
+        self.frames = []
+        self.open_upvalues = {}
+
+    def interpret(self, function):
+        self.stack = [VMClosure(function, [])]
+        self.frames = [CallFrame(self.stack[0], 0)]
+        self.open_upvalues = {}
+        try:
+            self._run()
+        except RuntimeException as re:
+            self.lox.runtime_error(re)
+
+    def _capture_upvalue(self, index):
+        upvalue = self.open_upvalues.get(index)
+        if upvalue is None:
+            upvalue = Upvalue(index)
+            self.open_upvalues[index] = upvalue
+
+        return upvalue
+
+    def _close_upvalues(self, last):
+        stack = self.stack
+        for index in [i for i in self.open_upvalues if i >= last]:
+            upvalue = self.open_upvalues.pop(index)
+            upvalue.value = stack[index]
+            upvalue.is_open = False
+
+    def _call_value(self, callee, argc, token):
+        """Prepare a call of callee with argc arguments on the stack.
+
+        Returns the new frame for Lox closures, or None when the call has
+        already completed and its result replaced the callee on the stack.
+        """
+        stack = self.stack
+        base = len(stack) - argc - 1
+
+        if isinstance(callee, VMClosure):
+            return self._call_closure(callee, argc, base, token)
+
+        if isinstance(callee, VMBoundMethod):
+            stack[base] = callee.receiver
+            return self._call_closure(callee.method, argc, base, token)
+
+        if isinstance(callee, LoxClass):
+            stack[base] = LoxInstance(callee)
+            initializer = callee.initializer
+            if initializer is not None:
+                return self._call_closure(initializer, argc, base, token)
+            if argc != 0:
+                raise RuntimeException(token,
+                                       f"Expected 0 arguments but got {argc}.")
+            return None
+
+        if isinstance(callee, LoxCallable):
+            if argc != callee.arity:
+                raise RuntimeException(token,
+                                       f"Expected {callee.arity} arguments but got {argc}.")
+            arguments = stack[base + 1:]
+            del stack[base:]
+            stack.append(callee.__call__(self, arguments))
+            return None
+
+        raise RuntimeException(token, "Can only call functions and classes.")
+
+    def _call_closure(self, closure, argc, base, token):
+        if argc != closure.function.arity:
+            raise RuntimeException(token,
+                                   f"Expected {closure.function.arity} arguments but got {argc}.")
+
+        if len(self.frames) >= self.max_frames:
+            raise RuntimeException(token, "Stack overflow.")
+
+        frame = CallFrame(closure, base)
+        self.frames.append(frame)
+        return frame
+
+    def _run(self):
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        frames = self.frames
+        globals = self.globals
+
+        frame = frames[-1]
+        closure = frame.closure
+        chunk = closure.function.chunk
+        code = chunk.code
+        constants = chunk.constants
+        base = frame.base
+        ip = frame.ip
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op == GET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals:
+                    raise RuntimeException(chunk.tokens[ip - 2],
+                                           f"Undefined variable '{name}'.")
+                push(globals[name])
+            elif op == POP:
+                pop()
+            elif op == LESS:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a < b
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a + b
+                elif type(a) is str and type(b) is str:
+                    stack[-1] = a + b
+                else:
+                    raise RuntimeException(chunk.tokens[ip - 1],
+                                           "Operands must be two numbers or two strings.")
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a - b
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += code[ip]
+                ip += 1
+            elif op == JUMP:
+                ip += code[ip] + 1
+            elif op == LOOP:
+                ip += 1 - code[ip]
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == CALL or op == CALL_METHOD:
+                argc = code[ip]
+                ip += 1
+                token = chunk.tokens[ip - 2]
+                if op == CALL:
+                    callee = stack[-argc - 1]
+                else:
+                    receiver = stack[-argc - 1]
+                    callee = stack[-argc - 2]
+                    if receiver is _NO_RECEIVER:
+                        del stack[-argc - 1]
+                    else:
+                        del stack[-argc - 2]
+                        callee = VMBoundMethod(receiver, callee)
+
+                frame.ip = ip
+                new_frame = self._call_value(callee, argc, token)
+                if new_frame is not None:
+                    frame = new_frame
+                    closure = frame.closure
+                    chunk = closure.function.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    base = frame.base
+                    ip = 0
+            elif op == RETURN:
+                result = pop()
+                if self.open_upvalues:
+                    self._close_upvalues(base)
+                frames.pop()
+                if not frames:
+                    del stack[:]
+                    return
+
+                del stack[base:]
+                push(result)
+
+                frame = frames[-1]
+                closure = frame.closure
+                chunk = closure.function.chunk
+                code = chunk.code
+                constants = chunk.constants
+                base = frame.base
+                ip = frame.ip
+            elif op == GET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                ip += 1
+                push(stack[upvalue.index] if upvalue.is_open else upvalue.value)
+            elif op == SET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                ip += 1
+                if upvalue.is_open:
+                    stack[upvalue.index] = stack[-1]
+                else:
+                    upvalue.value = stack[-1]
+            elif op == GET_PROPERTY:
+                obj = stack[-1]
+                if not isinstance(obj, LoxInstance):
+                    raise RuntimeException(chunk.tokens[ip - 1],
+                                           "Only instances have properties.")
+                stack[-1] = obj.get(chunk.tokens[ip - 1])
+                ip += 1
+            elif op == GET_METHOD:
+                obj = stack[-1]
+                if not isinstance(obj, LoxInstance):
+                    raise RuntimeException(chunk.tokens[ip - 1],
+                                           "Only instances have properties.")
+                name = constants[code[ip]]
+                ip += 1
+                method = None
+                if name not in obj.shape.slots:
+                    method = obj.klass.find_method(name)
+                if method is not None:
+                    stack[-1] = method
+                    push(obj)
+                else:
+                    stack[-1] = obj.get(chunk.tokens[ip - 2])
+                    push(_NO_RECEIVER)
+            elif op == SET_PROPERTY:
+                value = pop()
+                obj = stack[-1]
+                if not isinstance(obj, LoxInstance):
+                    raise RuntimeException(chunk.tokens[ip - 1],
+                                           "Only instances have fields.")
+                obj.set(chunk.tokens[ip - 1], value)
+                stack[-1] = value
+                ip += 1
+            elif op == GREATER:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a > b
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a >= b
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a <= b
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a * b
+            elif op == DIVIDE:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operands must be numbers.")
+                stack[-1] = a / b
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = self._is_equal(stack[-1], b)
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = not self._is_equal(stack[-1], b)
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == NEGATE:
+                if type(stack[-1]) is not float:
+                    raise RuntimeException(chunk.tokens[ip - 1], "Operand must be a number.")
+                stack[-1] = -stack[-1]
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == PRINT:
+                print(self._stringify(pop()))
+            elif op == DEFINE_GLOBAL:
+                globals[constants[code[ip]]] = pop()
+                ip += 1
+            elif op == SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals:
+                    raise RuntimeException(chunk.tokens[ip - 2],
+                                           f"Undefined variable '{name}'.")
+                globals[name] = stack[-1]
+            elif op == CLOSURE:
+                function = constants[code[ip]]
+                ip += 1
+                upvalues = []
+                for _ in range(function.upvalue_count):
+                    is_local = code[ip]
+                    index = code[ip + 1]
+                    ip += 2
+                    if is_local:
+                        upvalues.append(self._capture_upvalue(base + index))
+                    else:
+                        upvalues.append(closure.upvalues[index])
+                push(VMClosure(function, upvalues))
+            elif op == CLOSE_UPVALUE:
+                self._close_upvalues(len(stack) - 1)
+                pop()
+            elif op == GET_SUPER:
+                superclass = pop()
+                name = constants[code[ip]]
+                ip += 1
+                method = superclass.find_method(name)
+                if method is None:
+                    raise RuntimeException(chunk.tokens[ip - 2],
+                                           f"Undefined property {name}.")
+                stack[-1] = method.bind(stack[-1])
+            elif op == CLASS:
+                push(LoxClass(constants[code[ip]], None, {}))
+                ip += 1
+            elif op == INHERIT:
+                klass = pop()
+                superclass = stack[-1]
+                if not isinstance(superclass, LoxClass):
+                    raise RuntimeException(chunk.tokens[ip - 1],
+                                           "Superclass must be a class.")
+                klass.inherit(superclass)
+                stack[-1] = klass
+            elif op == METHOD:
+                method = pop()
+                stack[-1].add_method(constants[code[ip]], method)
+                ip += 1
+            else:
+                raise RuntimeError(f"Unknown opcode {op}.")
+
+    def _is_equal(self, a, b):
+        if a == None and b == None:
+            return True
+        if a == None:
+            return False
+
+        return a == b
+
+    def _stringify(self, obj):
+        if obj is None:
+            return 'nil'
+
+        if isinstance(obj, float):
+            text = str(obj)
+            if text.endswith(".0"):
+                text = text[0:len(text) - 2]
+
+            return text
+
+        return str(obj)
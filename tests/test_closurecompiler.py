@@ -0,0 +1,59 @@
+import pytest
+
+from lox.closurecompiler import ClosureInterpreter
+from lox.lox import Lox
+from lox.options import Options
+
+def run(capsys, source, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run(source)
+    return capsys.readouterr().out
+
+PROGRAMS = [
+    """
+    fun makeCounter() {
+      var i = 0;
+      fun count() { i = i + 1; return i; }
+      return count;
+    }
+    var c = makeCounter();
+    print c();
+    print c();
+    print clock() > 0;
+    """,
+    """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    for (var i = 0; i < 5; i = i + 1) { print fib(i); }
+    """,
+    """
+    class A { init(x) { this.x = x; } get() { return this.x; } }
+    class B < A { get() { return "B" + super.get(); } }
+    var b = B("x");
+    var g = b.get;
+    print g();
+    print b;
+    """,
+    """
+    class O {}
+    var o = O();
+    fun a(x) { return "a" + x; }
+    fun b(x) { return "b" + x; }
+    fun swap() { o.f = b; return "!"; }
+    o.f = a;
+    print o.f(swap());
+    print o.f(swap());
+    """,
+    'print "a" < 1;',
+    "fun f() {} f(1);",
+]
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_closure_engine_matches_interpreter(capsys, source):
+    expected = run(capsys, source, "interpreter")
+
+    assert run(capsys, source, "closure") == expected
+
+def test_closure_engine_is_selected():
+    lox = Lox(Options(engine="closure"))
+
+    assert isinstance(lox.interpreter, ClosureInterpreter)
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+
+SOURCE = """
+fun fib(n) {
+  if (n < 2) return n;
+  { var a = fib(n - 1); var b = fib(n - 2); return a + b; }
+}
+print fib(15);
+
+fun makeCounter(start) {
+  var count = start;
+  fun next() { count = count + 1; return count; }
+  return next;
+}
+var first = makeCounter(10);
+var second = makeCounter(20);
+print first();
+print second();
+print first();
+"""
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_scopes_are_reused(capsys, engine):
+    lox = Lox(Options(engine=engine, frame_pool=64))
+    lox.run(SOURCE)
+
+    assert capsys.readouterr().out == "610\n11\n21\n12\n"
+    pool = lox.interpreter.frame_pool
+    # fib recurses 15 calls deep, each with a block scope.
+    assert pool.allocated <= 2 * 15 + 2
+    assert pool.reused > 1000
+    assert pool.dropped == 0
+
+def test_free_lists_are_bounded(capsys):
+    lox = Lox(Options(frame_pool=2))
+    lox.run(SOURCE)
+
+    assert capsys.readouterr().out == "610\n11\n21\n12\n"
+    pool = lox.interpreter.frame_pool
+    assert pool.dropped > 0
+    assert len(pool.frames) == 2 and len(pool.blocks) == 2
+
+def test_pool_is_off_by_default(capsys):
+    lox = Lox()
+    lox.run(SOURCE)
+
+    assert lox.interpreter.frame_pool is None
+    assert capsys.readouterr().out == "610\n11\n21\n12\n"
+
+def test_report():
+    lox = Lox(Options(frame_pool=64, inline_size=0))
+    lox.run("fun f(n) { return n; } f(1); f(2); f(3);")
+    out = io.StringIO()
+    lox.interpreter.frame_pool.report(out)
+
+    assert out.getvalue() == \
+        "frame pool: 3 scope(s), 2 reused (66.7%), 1 allocated, 0 dropped (size 64)\n"
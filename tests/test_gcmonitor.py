@@ -0,0 +1,51 @@
+import gc
+import io
+
+from lox.gcmonitor import GCMonitor
+from lox.lox import Lox
+from lox.options import Options
+
+def test_collections_are_counted():
+    monitor = GCMonitor()
+    try:
+        gc.collect()
+        gc.collect(0)
+    finally:
+        monitor.close()
+    out = io.StringIO()
+    monitor.report(out)
+
+    assert monitor.collections == [1, 0, 1]
+    assert out.getvalue().startswith("gc: 2 collection(s) (generation 0: 1, 1: 0, 2: 1), ")
+
+def test_program_is_frozen_before_running(capsys):
+    lox = Lox(Options(gc_freeze=True))
+    try:
+        lox.run("fun f(n) { return n + 1; } print f(1);")
+    finally:
+        gc.unfreeze()
+        lox.gc.close()
+
+    assert capsys.readouterr().out == "2\n"
+    assert lox.gc.frozen > 0
+
+def test_recursive_local_functions_leave_no_cycles(capsys):
+    lox = Lox()
+    gc.collect()
+    gc.disable()
+    try:
+        lox.run("""
+        fun run(n) {
+          fun fact(k) { if (k <= 1) return 1; return k * fact(k - 1); }
+          return fact(n);
+        }
+        var total = 0;
+        for (var i = 0; i < 100; i = i + 1) total = total + run(5);
+        print total;
+        """)
+        garbage = gc.collect()
+    finally:
+        gc.enable()
+
+    assert capsys.readouterr().out == "12000\n"
+    assert garbage == 0
@@ -0,0 +1,112 @@
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+
+def run(capsys, source, engine="interpreter"):
+    lox = Lox(Options(engine=engine, inline_size=0))
+    lox.run(source)
+    return lox, capsys.readouterr().out
+
+def site(lox, name, line):
+    cache, = (cache for cache in lox.interpreter.property_caches
+              if cache.name.lexeme == name and cache.name.line == line)
+    return cache
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_monomorphic_site_hits(capsys, engine):
+    lox, out = run(capsys, """
+    class P { init() { this.x = 1; } get() { return this.x; } }
+    var p = P();
+    var total = 0;
+    for (var i = 0; i < 10; i = i + 1) total = total + p.get();
+    print total;
+    """, engine)
+
+    assert out == "10\n"
+    cache = site(lox, "get", 5)
+    assert (cache.hits, cache.misses) == (9, 1)
+    assert len(cache.entries) == 1
+
+def test_polymorphic_and_megamorphic_sites(capsys):
+    lox, out = run(capsys, """
+    class A { init() { this.v = 1; } }
+    class B { init() { this.w = 0; this.v = 2; } }
+    class C { init() { this.v = 3; } }
+    fun read(o) { return o.v; }
+    print read(A()) + read(B()) + read(A()) + read(B());
+    for (var i = 0; i < 5; i = i + 1) {
+      class D { init() { this.v = i; } }
+      read(D());
+    }
+    """)
+
+    cache = site(lox, "v", 5)
+    assert out == "6\n"
+    assert cache.megamorphic
+    assert len(cache.entries) == 4
+
+def test_redefined_class_misses(capsys):
+    lox, out = run(capsys, """
+    fun make(n) {
+      class K { m() { return n; } }
+      return K();
+    }
+    fun call(k) { return k.m(); }
+    print call(make(1)) + call(make(2));
+    """)
+
+    assert out == "3\n"
+    assert site(lox, "m", 6).misses == 2
+
+def test_set_caches_shape_transitions(capsys):
+    lox, out = run(capsys, """
+    class P {}
+    fun make(x) { var p = P(); p.x = x; return p; }
+    var a = make(1);
+    var b = make(2);
+    b.x = 3;
+    print a.x + b.x;
+    """)
+
+    assert out == "4\n"
+    set_x = site(lox, "x", 3)
+    assert (set_x.hits, set_x.misses) == (1, 1)
+    assert site(lox, "x", 6).misses == 1
+
+def test_undefined_property_is_reported(capsys):
+    lox, out = run(capsys, """
+    class P {}
+    var p = P();
+    p.x = 1;
+    print p.x;
+    print p.y;
+    """)
+
+    assert lox.had_runtime_error
+    assert out == "1\nUndefined property y.\n [line 6]\n"
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_call_sites_cache_their_callee(capsys, engine):
+    lox, out = run(capsys, """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    class P { init(x) { this.x = x; } }
+    fun make(n) { fun f() { return n; } return f; }
+    var total = 0;
+    for (var i = 0; i < 10; i = i + 1) total = total + P(i).x + make(i)();
+    print fib(10) + total;
+    fib(1, 2);
+    """, engine)
+
+    caches = lox.interpreter.call_caches
+    assert out == "145\nExpected 1 arguments but got 2.\n [line 8]\n"
+    assert sum(cache.megamorphic for cache in caches) == 1
+    assert max(cache.hits for cache in caches) > 50
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+@pytest.mark.parametrize("source", ["nil();", "var f; f();"])
+def test_calling_nil_is_reported(capsys, engine, source):
+    lox, out = run(capsys, source, engine)
+
+    assert lox.had_runtime_error
+    assert out == "Can only call functions and classes.\n [line 1]\n"
@@ -0,0 +1,59 @@
+import pytest
+
+from lox.inliner import Inliner
+from lox.lox import Lox
+from lox.options import Options
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import Scanner
+
+def inline(source, max_size=16):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    inliner = Inliner(lox.interpreter, max_size)
+    inliner.inline(statements)
+    return [declaration.name.lexeme for declaration, _ in inliner.inlined]
+
+def test_small_functions_are_inlined():
+    assert inline("fun square(x) { return x * x; } print square(2);") == ["square"]
+
+def test_recursive_large_and_multi_statement_functions_are_not():
+    source = """
+    fun fact(n) { return n * fact(n - 1); }
+    fun body(n) { print n; return n; }
+    fun big(n) { return n + n + n; }
+    fun f() { fun local(x) { return x; } return local(1); }
+    print fact(1) + body(1) + big(1) + f();
+    """
+
+    assert inline(source, max_size=4) == []
+
+def test_wrong_argument_count_is_not_inlined():
+    assert inline("fun square(x) { return x * x; } print square(1, 2);") == []
+
+PROGRAM = """
+fun square(x) { return x * x; }
+fun add(a, b) { return a + b; }
+fun norm(x, y) { return add(square(x), square(y)); }
+print norm(3, 4);
+fun again() { return square(5); }
+print again();
+square = add;
+print norm(3, 4);
+"""
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_inlined_calls_check_the_global_still_holds_the_function(capsys, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run(PROGRAM)
+
+    assert capsys.readouterr().out.startswith("25\n25\nExpected 2 arguments but got 1.")
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_inlining_matches_ordinary_calls(capsys, engine):
+    source = PROGRAM.replace("square = add;", "")
+    Lox(Options(engine=engine)).run(source)
+    Lox(Options(engine=engine, inline_size=0)).run(source)
+
+    assert capsys.readouterr().out == "25\n25\n25\n" * 2
@@ -1,10 +1,12 @@
 import pytest
 
 from lox.stmt import Class, Expression, Function, Print, Var
-from lox.expr import Binary, Literal, Variable
+from lox.expr import Binary, Literal, Multiply, Variable
 from lox.token import TokenType, Token
 from lox.interpreter import Interpreter
+from lox.loxfunction import Loxfunction
 from lox.lox import Lox
+from lox.options import Options
 
 @pytest.fixture
 def lox():
@@ -66,3 +68,104 @@ def test_class_declartion(interpreter, lox):
     interpreter.interpret([expression])
 
     assert lox.had_error == False
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_redefined_global_updates_cached_sites(capsys, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run("fun greet() { return name; } var name = \"a\"; print greet();")
+    lox.run("var name = \"b\"; print greet();")
+    lox.run("name = \"c\"; print greet();")
+
+    assert capsys.readouterr().out == "a\nb\nc\n"
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_undefined_global_is_reported_when_read(capsys, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run("fun f() { return later; } var later = 1; print f();")
+    lox.run("fun g() { return missing; }")
+
+    assert lox.had_runtime_error == False
+
+    lox.run("print g();")
+
+    assert lox.had_runtime_error == True
+    assert capsys.readouterr().out.startswith("1\nUndefined variable 'missing'.")
+
+def test_unary_and_logical(capsys):
+    Lox().run('print -(1 + 2); print !nil; print false or true; print nil or "b"; print 1 and false;')
+
+    assert capsys.readouterr().out == "-3\nTrue\nTrue\nb\nFalse\n"
+
+def test_operators_are_specialized(interpreter, lox):
+    # 2 * 3 built by hand as a generic Binary node
+    operator = Token(TokenType.STAR, '*', None, 1)
+    binary = Binary(Literal(2.0), operator, Literal(3.0))
+
+    assert interpreter._evaluate(binary) == 6.0
+    assert type(binary) is Multiply
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_return_from_nested_blocks_and_loops(capsys, engine):
+    Lox(Options(engine=engine)).run("""
+    fun find(limit) {
+      for (var i = 0; i < 100; i = i + 1) {
+        { if (i == limit) return i; }
+      }
+      return "none";
+    }
+    fun nothing() { while (true) { return; } }
+    print find(3);
+    print find(200);
+    print nothing();
+    """)
+
+    assert capsys.readouterr().out == "3\nnone\nnil\n"
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_tail_calls_run_in_constant_stack(capsys, engine):
+    Lox(Options(engine=engine)).run("""
+    fun loop(n, acc) { if (n == 0) return acc; return loop(n - 1, acc + 1); }
+    fun even(n) { if (n == 0) return true; return odd(n - 1); }
+    fun odd(n) { if (n == 0) return false; return even(n - 1); }
+    print loop(20000, 0);
+    print even(20001);
+    """)
+
+    assert capsys.readouterr().out == "20000\nFalse\n"
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_inherited_methods_are_flattened(capsys, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run("""
+    class A { init(x) { this.x = x; } name() { return "A"; } show() { return this.name() + this.x; } }
+    class B < A { name() { return "B"; } }
+    class C < B {}
+    var c = C("!");
+    print c.show();
+    print C;
+    """)
+
+    assert capsys.readouterr().out == "B!\nC\n"
+    klass = lox.interpreter.globals.cell("C").value
+    assert sorted(klass.table) == ["init", "name", "show"]
+    assert klass.methods == {}
+    assert klass.arity == 1
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_invoke_runs_methods_without_binding(capsys, monkeypatch, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run("""
+    class A { init(n) { this.n = n; } get() { return this.n; } }
+    fun twice(x) { return x * 2; }
+    var a = A(2);
+    a.f = twice;
+    """)
+    monkeypatch.setattr(Loxfunction, "bind", lambda *args: pytest.fail("bound a method"))
+    lox.run("""
+    print a.get();
+    print a.f(a.get());
+    print a.init(5).get();
+    a.get(1);
+    """)
+
+    assert capsys.readouterr().out == "2\n4\n5\nExpected 0 arguments but got 1.\n [line 5]\n"
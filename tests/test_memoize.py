@@ -0,0 +1,97 @@
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import Scanner
+from lox.memoize import PurityAnalysis
+
+def pure(source):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    return sorted(declaration.name.lexeme
+                  for declaration in PurityAnalysis(lox.interpreter.locals).analyze(statements))
+
+def test_side_effects_make_functions_impure():
+    source = """
+    var g = 1;
+    class C {}
+    fun reads(x) { return x + g; }
+    fun prints(x) { print x; }
+    fun sets(c) { c.x = 1; }
+    fun assigns() { g = 2; }
+    fun calls(x) { return prints(x); }
+    fun clocks() { return clock(); }
+    fun nested() { fun inner() {} return inner; }
+    fun locals(n) { var s = 0; { var i = n; s = s + i; } n = n + 1; return s; }
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    fun even(n) { if (n == 0) return true; return odd(n - 1); }
+    fun odd(n) { if (n == 0) return false; return even(n - 1); }
+    """
+
+    assert pure(source) == ["even", "fib", "locals", "odd"]
+
+def test_reassigned_functions_are_impure():
+    assert pure("fun f() { return 1; } fun g() { return f(); } f = nil;") == []
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_pure_calls_are_cached(capsys, engine):
+    lox = Lox(Options(engine=engine, memoize=True, inline_size=0))
+    lox.run("""
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    fun id(x) { return x; }
+    print fib(40);
+    print id(0); print id(-0); print id(true); print id(1);
+    """)
+
+    assert capsys.readouterr().out == "102334155\n0\n-0\nTrue\n1\n"
+    memos = {memo.declaration.name.lexeme: memo for memo in lox.interpreter.memos.values()}
+    assert (memos["fib"].hits, memos["fib"].misses) == (38, 41)
+    assert (memos["id"].hits, memos["id"].misses) == (0, 4)
+
+def test_cache_is_bounded(capsys):
+    lox = Lox(Options(memoize=True, memo_size=2, inline_size=0))
+    lox.run("fun sq(x) { return x * x; } for (var i = 0; i < 10; i = i + 1) sq(i);")
+
+    memo, = lox.interpreter.memos.values()
+    assert list(memo.results) == [((float, 8.0),), ((float, 9.0),)]
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+@pytest.mark.parametrize("redefinition", [
+    "var cnt = 0; fun h(x) { cnt = cnt + 1; return cnt; } g = h;",
+    "var cnt = 0; fun g(x) { cnt = cnt + 1; return cnt; }",
+])
+def test_later_prompt_lines_can_make_functions_impure(capsys, engine, redefinition):
+    lox = Lox(Options(engine=engine, memoize=True, inline_size=0))
+    lox.run("fun g(x) { return x; } fun f(x) { return g(x); }")
+    lox.run("print f(1); print f(1);")
+    lox.run(redefinition)
+    lox.run("print f(1); print f(1);")
+
+    assert capsys.readouterr().out == "1\n1\n1\n2\n"
+    assert lox.interpreter.memos == {}
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+@pytest.mark.parametrize("inline_size", [0, 8])
+def test_tail_called_and_inlined_functions_use_their_memo(capsys, engine, inline_size):
+    lox = Lox(Options(engine=engine, memoize=True, inline_size=inline_size))
+    lox.run("""
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    fun g(n) { if (n < 0) return 0; return fib(n); }
+    fun even(n) { if (n == 0) return true; return odd(n - 1); }
+    fun odd(n) { if (n == 0) return false; return even(n - 1); }
+    fun f(n) { return fib(n); }
+    print g(20); print g(20);
+    print even(10); print odd(7);
+    print f(21); print f(21);
+    """)
+
+    assert capsys.readouterr().out == "6765\n6765\nTrue\nTrue\n10946\n10946\n"
+    memos = {memo.declaration.name.lexeme: memo for memo in lox.interpreter.memos.values()}
+    assert (memos["fib"].hits, memos["fib"].misses) == (20, 22)
+    assert (memos["g"].hits, memos["g"].misses) == (1, 1)
+    assert (memos["even"].hits, memos["even"].misses) == (0, 6)
+    assert (memos["odd"].hits, memos["odd"].misses) == (1, 5)
+    assert (memos["f"].hits, memos["f"].misses) == (1, 1)
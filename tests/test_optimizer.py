@@ -0,0 +1,45 @@
+import pytest
+
+from lox.lox import Lox
+from lox.optimizer import Optimizer
+from lox.options import Options
+from lox.parser import Parser
+from lox.printer import AtsPrinter
+from lox.resolver import Resolver
+from lox.scanner import Scanner
+
+def optimize(source):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    return AtsPrinter().print(Optimizer().optimize(statements))
+
+def test_folds_arithmetic_comparisons_and_strings():
+    assert optimize('print 1 + 2 * 3; print "a" + "b"; print -(4 - 1) < 0 and !nil;') == \
+        '(print 7)\n(print "ab")\n(print true)'
+
+def test_keeps_operations_that_fail_at_runtime():
+    assert optimize('print 1 + "a"; print 1 / 0;') == '(print (+ 1 "a"))\n(print (/ 1 0))'
+
+def test_prunes_constant_branches_and_loops():
+    assert optimize('if (false) print 1; else print 2; if (nil) print 3; while (false) print 4;') == \
+        '(print 2)'
+
+def test_drops_statements_after_return():
+    assert optimize('fun f() { { return 1; print 2; } print 3; }') == \
+        '(fun f () (block (return 1)) (print 3))'
+
+PROGRAM = """
+fun f(a) {
+  var b = 2 * 3;
+  if (true) { var c = a + b; fun g() { return c + b; } return g(); print "dead"; }
+}
+print f(1);
+"""
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure", "vm"])
+def test_optimized_program_keeps_resolved_slots(capsys, engine):
+    Lox(Options(engine=engine)).run(PROGRAM)
+    Lox(Options(engine=engine, optimize=False)).run(PROGRAM)
+
+    assert capsys.readouterr().out == "13\n13\n"
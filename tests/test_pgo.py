@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+
+SOURCE = """
+fun sum(n) {
+  var total = 0;
+  for (var i = 0; i < n; i = i + 1) total = total + i;
+  return total;
+}
+print sum(100);
+"""
+
+def run(capsys, source, **options):
+    lox = Lox(Options(**options))
+    lox.run(source)
+    return lox, capsys.readouterr()
+
+def test_record_writes_counts_and_types(capsys, tmp_path):
+    path = tmp_path / "profile.json"
+    _, out = run(capsys, SOURCE, pgo_record=str(path))
+
+    profile = json.loads(path.read_text())
+    assert out.out == "4950\n"
+    assert list(profile["functions"].values()) == [1]
+    assert list(profile["loops"].values()) == [100]
+    assert ["FloatLess", 8] in profile["types"].values()
+
+def test_use_prespecializes_nodes_and_functions(capsys, tmp_path):
+    path = tmp_path / "profile.json"
+    run(capsys, SOURCE, pgo_record=str(path))
+
+    lox, out = run(capsys, SOURCE, pgo_use=str(path), tier_threshold=50)
+
+    assert out.out == "4950\n"
+    assert out.err == ""
+    assert lox.interpreter.quickened > 0
+    assert [declaration.name.lexeme for declaration, _ in lox.tier.promoted] == ["sum"]
+
+def test_stale_profile_is_ignored(capsys, tmp_path):
+    path = tmp_path / "profile.json"
+    run(capsys, SOURCE, pgo_record=str(path))
+
+    _, out = run(capsys, SOURCE.replace("100", "10"), pgo_use=str(path))
+
+    assert out.out == "45\n"
+    assert "recorded for a different program" in out.err
+
+@pytest.mark.parametrize("section, entries, message", [
+    ("types", {"0": ["FloatAdd", 100]}, "don't match the program"),
+    ("functions", {"-1": 100}, "unknown node position -1"),
+    ("loops", {"-1": 100}, "unknown node position -1"),
+])
+def test_mismatched_profile_is_ignored(capsys, tmp_path, section, entries, message):
+    path = tmp_path / "profile.json"
+    run(capsys, SOURCE, pgo_record=str(path))
+    profile = json.loads(path.read_text())
+    profile[section] = entries
+    path.write_text(json.dumps(profile))
+
+    _, out = run(capsys, SOURCE, pgo_use=str(path))
+
+    assert out.out == "4950\n"
+    assert message in out.err
+
+@pytest.mark.parametrize("section", ["types", "functions", "loops"])
+def test_boolean_counts_are_ignored(capsys, tmp_path, section):
+    path = tmp_path / "profile.json"
+    run(capsys, SOURCE, pgo_record=str(path))
+    profile = json.loads(path.read_text())
+    entries = profile[section]
+    assert entries
+    for position, value in entries.items():
+        if isinstance(value, list):
+            value[1] = True
+        else:
+            entries[position] = True
+    path.write_text(json.dumps(profile))
+
+    _, out = run(capsys, SOURCE, pgo_use=str(path))
+
+    assert out.out == "4950\n"
+    assert "don't match the program" in out.err
@@ -0,0 +1,53 @@
+from lox.lox import Lox
+from lox.options import Options
+
+def run(capsys, source, threshold=2):
+    lox = Lox(Options(quicken_threshold=threshold))
+    lox.run(source)
+    return lox, capsys.readouterr().out
+
+def test_stable_nodes_are_quickened(capsys):
+    lox, out = run(capsys, """
+    class P { init(x) { this.x = x; } }
+    fun sq(n) { return n * n; }
+    var p = P(3);
+    var total = 0;
+    for (var i = 0; i < 5; i = i + 1) total = total + sq(p.x);
+    print total;
+    """)
+
+    assert out == "45\n"
+    assert lox.interpreter.quickened > 0
+    assert lox.interpreter.deoptimized == 0
+
+def test_failed_guard_deoptimizes_and_keeps_result(capsys):
+    lox, out = run(capsys, """
+    fun add(a, b) { return a + b; }
+    print add(1, 2);
+    print add(3, 4);
+    print add("a", "b");
+    print add(5, 6);
+    """)
+
+    assert out == "3\n7\nab\n11\n"
+    assert lox.interpreter.deoptimized == 1
+
+def test_deoptimized_node_reports_runtime_errors(capsys):
+    lox, out = run(capsys, """
+    fun sub(a, b) { return a - b; }
+    print sub(3, 1);
+    print sub(5, 1);
+    print sub("a", 1);
+    """)
+
+    assert lox.had_runtime_error
+    assert out == "2\n4\nOperands must be numbers.\n [line 2]\n"
+
+def test_recursive_calls_quicken_nodes_being_evaluated(capsys):
+    lox, out = run(capsys, """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    print fib(15);
+    """, threshold=1)
+
+    assert out == "610\n"
+    assert lox.interpreter.deoptimized == 0
@@ -0,0 +1,129 @@
+from lox.expr import Assign, Call, Variable
+from lox.lox import Lox
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import Scanner
+
+def resolve(source):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    return lox.interpreter.locals
+
+def test_locals_get_depth_and_slot():
+    locals = resolve("fun f(a, b) { var c = b; { var d = a; c = d; } }")
+
+    resolved = sorted((expr.name.lexeme, depth_and_slot)
+                      for expr, depth_and_slot in locals.items()
+                      if isinstance(expr, (Variable, Assign)))
+
+    assert resolved == [("a", (1, 0)), ("b", (0, 1)), ("c", (1, 2)), ("d", (0, 0))]
+
+def test_globals_are_not_resolved():
+    assert resolve("var a = 1; print a;") == {}
+
+def test_class_name_slot_is_defined_after_methods(capsys):
+    Lox().run("""
+    {
+      var before = "before";
+      class A { name() { return A; } }
+      var after = "after";
+      print A().name();
+      print before + after;
+    }
+    """)
+
+    assert capsys.readouterr().out == "A\nbeforeafter\n"
+
+def test_only_returned_calls_are_tail_calls():
+    lox = Lox()
+    source = "fun f(n) { if (n) return f(n - 1); return (f(0)); }"
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+
+    assert [type(stmt.value) for stmt in lox.interpreter.tail_calls] == [Call]
+
+def test_blocks_without_declarations_get_no_scope(capsys):
+    lox = Lox()
+    source = """
+    fun f(n) {
+      var total = 0;
+      for (var i = 0; i < n; i = i + 1) {
+        { total = total + i; }
+        if (i == 1) { var j = i; fun g() { return j + total; } total = g(); }
+      }
+      return total;
+    }
+    print f(4);
+    """
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    lox.interpreter.interpret(statements)
+
+    loop = statements[0].body[1]
+    body = loop.statements[1].body
+    assert loop.scoped
+    assert not body.scoped
+    assert not body.statements[0].statements[0].scoped
+    assert body.statements[0].statements[1].then_branch.scoped
+    assert capsys.readouterr().out == "7\n"
+
+def test_functions_capture_only_the_variables_they_use(capsys):
+    lox = Lox()
+    source = """
+    fun outer(a, b) {
+      var unused = "unused";
+      var count = 0;
+      fun middle() {
+        fun inner() { count = count + a; return count; }
+        return inner;
+      }
+      fun plain(x) { return x; }
+      return middle();
+    }
+    var counter = outer(2, 5);
+    print counter();
+    print counter();
+    """
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    lox.interpreter.interpret(statements)
+
+    outer = statements[0]
+    middle, plain = outer.body[2], outer.body[3]
+    inner = middle.body[0]
+    assert outer.upvalues == [] and plain.upvalues == []
+    assert middle.upvalues == [(0, 3), (0, 0)]
+    assert inner.upvalues == [(1, 0), (1, 1)]
+    assert outer.boxed_params == (0,)
+    assert outer.body[1].boxed and not outer.body[0].boxed
+    assert not middle.boxed and not plain.boxed
+
+    counter = lox.interpreter.globals.cell("counter").value
+    assert lox.interpreter.globals.cell("outer").value.closure is None
+    assert counter.closure.enclosing is None
+    assert [cell.value for cell in counter.closure.values] == [4.0, 2.0]
+    assert capsys.readouterr().out == "2\n4\n"
+
+def test_local_functions_that_call_themselves_use_their_own_slot(capsys):
+    lox = Lox()
+    source = """
+    fun outer() {
+      fun count(n) { if (n > 0) return count(n - 1); return "done"; }
+      fun renamed(n) { if (n > 0) return renamed(n - 1); return "renamed"; }
+      fun other(n) { return "other"; }
+      renamed = other;
+      print count(3);
+      print renamed(3);
+    }
+    outer();
+    """
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    lox.interpreter.interpret(statements)
+
+    count, renamed, other = statements[0].body[:3]
+    assert count.recursive and count.upvalues == [] and not count.boxed
+    assert not renamed.recursive and renamed.upvalues == [(0, 1)] and renamed.boxed
+    assert not other.recursive
+    assert capsys.readouterr().out == "done\nother\n"
@@ -0,0 +1,37 @@
+from lox.lox import Lox
+
+def instances(source):
+    lox = Lox()
+    lox.run(source)
+    return lox.interpreter.globals
+
+def test_instances_with_the_same_fields_share_a_shape(capsys):
+    globals = instances("""
+    class Point { init(x, y) { this.x = x; this.y = y; } }
+    var a = Point(1, 2);
+    var b = Point(3, 4);
+    var c = Point(5, 6);
+    c.z = 7;
+    var d = Point(8, 9);
+    d.y = 10;
+    """)
+    a, b, c, d = (globals.cell(name).value for name in "abcd")
+
+    assert a.shape is b.shape is d.shape
+    assert a.shape.slots == {"x": 0, "y": 1}
+    assert c.shape is a.shape.transitions["z"]
+    assert c.values == [5.0, 6.0, 7.0]
+    assert d.values == [8.0, 10.0]
+
+def test_field_order_picks_the_shape(capsys):
+    globals = instances("""
+    class Bag {}
+    var a = Bag(); a.x = 1; a.y = 2;
+    var b = Bag(); b.y = 3; b.x = 4;
+    print a.x + b.x;
+    """)
+    a, b = (globals.cell(name).value for name in "ab")
+
+    assert capsys.readouterr().out == "5\n"
+    assert a.shape is not b.shape
+    assert b.shape.slots == {"y": 0, "x": 1}
@@ -0,0 +1,56 @@
+from lox.lox import Lox
+from lox.options import Options
+
+def run(capsys, source, **options):
+    lox = Lox(Options(**options))
+    lox.run(source)
+    return lox, capsys.readouterr().out
+
+def promoted(lox):
+    return [declaration.name.lexeme for declaration, _ in lox.interpreter.tier.promoted]
+
+def test_hot_function_is_promoted(capsys):
+    source = "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); } print fib(10);"
+
+    lox, out = run(capsys, source, tier_threshold=10)
+
+    assert out == "55\n"
+    assert promoted(lox) == ["fib"]
+
+def test_cold_function_is_not_promoted(capsys):
+    lox, out = run(capsys, "fun f() { return 1; } print f();", tier_threshold=10)
+
+    assert out == "1\n"
+    assert promoted(lox) == []
+
+def test_loop_iterations_count_towards_promotion(capsys):
+    source = """
+    fun loop() { var i = 0; while (i < 20) i = i + 1; return i; }
+    print loop();
+    print loop();
+    """
+
+    lox, out = run(capsys, source, tier_threshold=10)
+
+    assert out == "20\n20\n"
+    assert promoted(lox) == ["loop"]
+
+def test_promotion_is_shared_by_bound_methods_and_closures(capsys):
+    source = """
+    class Counter {
+      init() { this.n = 0; }
+      add() { this.n = this.n + 1; return this.n; }
+    }
+    var c = Counter();
+    var add = c.add;
+    fun make() { var x = 0; fun inc() { x = x + 1; return x; } return inc; }
+    var inc = make();
+    for (var i = 0; i < 5; i = i + 1) { add(); c.add(); inc(); }
+    print c.n;
+    print inc();
+    """
+
+    lox, out = run(capsys, source, tier_threshold=3)
+
+    assert out == "10\n6\n"
+    assert sorted(promoted(lox)) == ["add", "inc"]
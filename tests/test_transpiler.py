@@ -0,0 +1,93 @@
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import Scanner
+from lox.transpiler import Transpiler
+
+def run(capsys, source, **options):
+    lox = Lox(Options(**options))
+    lox.run(source)
+    return capsys.readouterr().out
+
+def transpile(source):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    return Transpiler(lox.interpreter.locals).transpile(statements)
+
+PROGRAMS = [
+    """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    print fib(15);
+    print fib;
+    print clock;
+    """,
+    """
+    var fns = nil;
+    for (var i = 0; i < 3; i = i + 1) {
+      var j = i;
+      fun f() { return j; }
+      if (i == 1) fns = f;
+    }
+    print fns();
+    """,
+    """
+    fun makeCounter() {
+      var i = 0;
+      fun count() { i = i + 1; return i; }
+      return count;
+    }
+    var c = makeCounter();
+    c();
+    print c();
+    """,
+    """
+    class Base { greet() { return "base"; } }
+    class Derived < Base {
+      init(name) { this.name = name; }
+      greet() { fun later() { return super.greet() + this.name; } return later(); }
+    }
+    var d = Derived("!");
+    print d.greet();
+    print d;
+    print Derived;
+    print d.init("?").name;
+    """,
+    "fun f(a, b) {} f(1);",
+    "fun f(a, b) {}\nf(1);",
+    "class A { init(x) {} }\nA();",
+    "class A { m() {} }\nA().m(1);",
+    "class A {}\nA(1);",
+    "print clock(1);",
+    'print "a" +\n 1;',
+    "class A {} print A().missing;",
+    "undefined = 1;",
+]
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_compiled_matches_interpreter(capsys, source):
+    expected = run(capsys, source)
+
+    assert run(capsys, source, run_compiled=True) == expected
+
+def test_locals_become_python_locals():
+    source = transpile("fun f(a) { var b = a; return b; }")
+
+    assert "l1_a=_M" in source
+    assert "l2_b = l1_a" in source
+
+def test_reassigned_captures_become_cells():
+    source = transpile("fun f() { var a = 1; fun g() { a = 2; } }")
+
+    assert "c1_a = _rt.Cell(1.0)" in source
+
+def test_emit_python(tmp_path):
+    out = tmp_path / "out.py"
+    lox = Lox(Options(emit_python=str(out)))
+
+    lox.run('print "hi";')
+
+    assert "print(_rt.stringify('hi'))" in out.read_text()
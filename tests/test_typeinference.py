@@ -0,0 +1,49 @@
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+from lox.parser import Parser
+from lox.resolver import Resolver
+from lox.scanner import Scanner
+from lox.typeinference import TypeInference
+
+def infer(source):
+    lox = Lox()
+    statements = Parser(Scanner(source, lox).scan_tokens(), lox).parse()
+    Resolver(lox.interpreter, lox).resolve(statements)
+    inference = TypeInference(lox.interpreter.locals)
+    inference.infer(statements)
+    return [type(expr).__name__ for expr in inference.operations]
+
+def test_number_locals_are_proven():
+    source = "fun f() { var i = 0; while (i < 10) i = i + 1; var j = -i * 2; }"
+
+    assert infer(source) == ["NumberLess", "NumberAdd", "NumberNegate", "NumberMultiply"]
+
+def test_parameters_globals_and_mixed_locals_are_unknown():
+    source = """
+    var g = 1;
+    fun f(n) {
+      var s = 1;
+      s = "a";
+      var u;
+      print n + 1; print g - 1; print s + 1; print u < 1;
+    }
+    """
+
+    assert infer(source) == ["Add", "Subtract", "Add", "Less"]
+
+def test_results_of_arithmetic_are_numbers():
+    assert infer("fun f(a) { var x = a * 2; return x + 1; }") == ["Multiply", "NumberAdd"]
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_unproven_operations_keep_their_errors(capsys, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run("""
+    fun f(x) { var i = 2; var j = i * i - 1; print j / 3 > 0; return x + i; }
+    print f(1);
+    f("a");
+    """)
+
+    assert lox.had_runtime_error
+    assert capsys.readouterr().out == "True\n3\nTrue\nOperands must be two numbers or two strings.\n [line 2]\n"
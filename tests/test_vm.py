@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from lox.lox import Lox
+from lox.options import Options
+
+def run(capsys, source, engine):
+    lox = Lox(Options(engine=engine))
+    lox.run(source)
+    return capsys.readouterr().out
+
+PROGRAMS = [
+    # Closures
+    """
+    fun makeCounter() {
+      var i = 0;
+      fun count() { i = i + 1; return i; }
+      return count;
+    }
+    var c = makeCounter();
+    print c();
+    print c();
+    print makeCounter;
+    print clock;
+    """,
+    # Per-iteration bindings and shadowing
+    """
+    var fns = nil;
+    for (var i = 0; i < 3; i = i + 1) {
+      var j = i;
+      fun f() { return j; }
+      if (i == 1) fns = f;
+    }
+    print fns();
+    {
+      var a = "outer";
+      {
+        fun show() { print a; }
+        show();
+        var a = "inner";
+        show();
+        print a;
+      }
+    }
+    """,
+    # Classes, bound methods and inheritance
+    """
+    class Point {
+      init(x, y) { this.x = x; this.y = y; }
+      sum() { return this.x + this.y; }
+    }
+    var p = Point(1, 2);
+    var m = p.sum;
+    p.x = 10;
+    print m();
+    print p;
+    print Point;
+    print m;
+    print p.init(5, 5).x;
+    class A { hi() { return "A"; } who() { return this.hi(); } }
+    class B < A { hi() { return "B" + super.hi(); } }
+    print B().who();
+    """,
+    # Recursion and loops
+    """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    print fib(15);
+    var s = "";
+    var i = 0;
+    while (i < 3) { s = s + "ab"; i = i + 1; }
+    print s;
+    print 7 / 2;
+    print 3 >= 3;
+    print nil == nil;
+    """,
+    # Runtime errors
+    'print "before"; print 1 + "a";',
+    "fun f(a) {} f(1, 2);",
+    'var x = "str"; x();',
+    "class Foo {} Foo().bar;",
+    "print missing;",
+]
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_vm_matches_interpreter(capsys, source):
+    expected = run(capsys, source, "interpreter")
+
+    assert run(capsys, source, "vm") == expected
+
+def test_test_plox(capsys):
+    with open(os.path.join(os.path.dirname(__file__), "..", "test.plox")) as file:
+        source = file.read()
+
+    assert run(capsys, source, "vm") == "spam\nbar\n"
+
+def test_logical_and_unary(capsys):
+    source = 'print -(1 + 2); print !nil; print nil or "b"; print false and 1;'
+
+    assert run(capsys, source, "vm") == "-3\nTrue\nb\nFalse\n"
+
+def test_zero_and_negative_zero_constants(capsys):
+    assert run(capsys, "print 0; print -0;", "vm") == "0\n-0\n"
+
+DEPTH = "fun depth(n) { if (n == 0) return 0; return 1 + depth(n - 1); } print depth(20000);"
+
+def test_recursion_is_not_bounded_by_python_stack(capsys):
+    assert run(capsys, DEPTH, "vm") == "20000\n"
+
+def test_stack_overflow_past_max_frames(capsys):
+    lox = Lox(Options(engine="vm", max_frames=100))
+    lox.run(DEPTH)
+
+    assert lox.had_runtime_error
+    assert capsys.readouterr().out == "Stack overflow.\n [line 1]\n"
+
+@pytest.mark.parametrize("engine", ["interpreter", "closure"])
+def test_python_recursion_limit_is_a_stack_overflow(capsys, engine):
+    assert run(capsys, DEPTH, engine) == "Stack overflow.\n [line 1]\n"